@@ -15,6 +15,7 @@
 "Feature extractors for Pacman game states"
 
 from game import Directions, Actions
+from collections import deque
 import util
 
 class FeatureExtractor:
@@ -41,15 +42,18 @@ class CoordinateExtractor(FeatureExtractor):
         feats['action=%s' % action] = 1.0
         return feats
 
-def closestFood(pos, food, walls):
+def closestFood(pos, food, walls, actionTable=None):
     """
     closestFood -- this is similar to the function that we have
     worked on in the search project; here its all in one place
+
+    Pass the layout's ActionTable to look neighbours up instead of testing
+    walls.
     """
-    fringe = [(pos[0], pos[1], 0)]
+    fringe = deque([(pos[0], pos[1], 0)])
     expanded = set()
     while fringe:
-        pos_x, pos_y, dist = fringe.pop(0)
+        pos_x, pos_y, dist = fringe.popleft()
         if (pos_x, pos_y) in expanded:
             continue
         expanded.add((pos_x, pos_y))
@@ -57,7 +61,10 @@ def closestFood(pos, food, walls):
         if food[pos_x][pos_y]:
             return dist
         # otherwise spread out from the location to its neighbours
-        nbrs = Actions.getLegalNeighbors((pos_x, pos_y), walls)
+        if actionTable != None:
+            nbrs = actionTable.neighbors[pos_x * actionTable.height + pos_y]
+        else:
+            nbrs = Actions.getLegalNeighbors((pos_x, pos_y), walls)
         for nbr_x, nbr_y in nbrs:
             fringe.append((nbr_x, nbr_y, dist+1))
     # no food found
@@ -76,6 +83,7 @@ class SimpleExtractor(FeatureExtractor):
         # extract the grid of food and wall locations and get the ghost locations
         food = state.getFood()
         walls = state.getWalls()
+        actionTable = state.data.layout.getActionTable()
         ghosts = state.getGhostPositions()
 
         features = util.Counter()
@@ -88,13 +96,13 @@ class SimpleExtractor(FeatureExtractor):
         next_x, next_y = int(x + dx), int(y + dy)
 
         # count the number of ghosts 1-step away
-        features["#-of-ghosts-1-step-away"] = sum((next_x, next_y) in Actions.getLegalNeighbors(g, walls) for g in ghosts)
+        features["#-of-ghosts-1-step-away"] = sum((next_x, next_y) in actionTable.getLegalNeighbors(g) for g in ghosts)
 
         # if there is no danger of ghosts then add the food feature
         if not features["#-of-ghosts-1-step-away"] and food[next_x][next_y]:
             features["eats-food"] = 1.0
 
-        dist = closestFood((next_x, next_y), food, walls)
+        dist = closestFood((next_x, next_y), food, walls, actionTable)
         if dist is not None:
             # make the distance a number less than one otherwise the update
             # will diverge wildly
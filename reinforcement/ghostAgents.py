@@ -29,7 +29,7 @@ class GhostAgent(Agent):
         if len(dist) == 0:
             return Directions.STOP
         else:
-            return util.chooseFromDistribution(dist)
+            return util.chooseFromDistribution(dist, self.random)
 
     def getDistribution(self, state):
         "Returns a Counter encoding a distribution over actions from the provided state."
@@ -53,7 +53,7 @@ class KeyboardAgent(Agent):
             move = Directions.STOP
 
         if move not in legal:
-            move = random.choice(legal)
+            move = self.random.choice(legal)
 
         self.lastMove = move
         return move
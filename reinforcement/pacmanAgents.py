@@ -59,7 +59,7 @@ class GreedyAgent(Agent):
                   for state, action in successors]
         bestScore = max(scored)[0]
         bestActions = [pair[1] for pair in scored if pair[0] == bestScore]
-        return random.choice(bestActions)
+        return self.random.choice(bestActions)
 
 
 def scoreEvaluation(state):
@@ -82,19 +82,21 @@ class SmartAgent(Agent):
         scored = [(self.smartEvaluation(succ), action) for succ, action in successors]
         bestScore = max(scored, key=lambda x: x[0])[0]
         bestActions = [pair[1] for pair in scored if pair[0] == bestScore]
-        return random.choice(bestActions)
+        return self.random.choice(bestActions)
 
     def smartEvaluation(self, state):
         score = state.getScore()
         food = state.getFood()
-        foodList = food.asList()
-        if len(foodList) == 0:
-            return float('inf')
         pacPos = state.getPacmanPosition()
-        dists = [util.manhattanDistance(pacPos, f) for f in foodList]
-        minFoodDist = min(dists) if dists else 0
+        if game.np is not None:
+            dists = game.ArrayGrid.fromGrid(food).manhattanDistances(pacPos)
+        else:
+            dists = [util.manhattanDistance(pacPos, f) for f in food.asList()]
+        if len(dists) == 0:
+            return float('inf')
+        minFoodDist = min(dists)
         score -= 2.0 * minFoodDist
-        score -= 10.0 * len(foodList)
+        score -= 10.0 * len(dists)
         ghostStates = state.getGhostStates()
         for g in ghostStates:
             gpos = g.getPosition()
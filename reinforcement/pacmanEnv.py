@@ -0,0 +1,245 @@
+"""
+A batched Pacman environment that steps many independent games in lockstep.
+
+Each game is held in NumPy arrays rather than a GameState: Pacman's cell,
+ghost positions in half-cells (scared ghosts move half a cell per turn), the
+scared timers, and one bit per food pellet and capsule of the layout.  A step
+is one round of the classic game: Pacman moves, then every ghost in turn, with
+the rules of pacman.PacmanRules and pacman.GhostRules (time penalty, eating,
+capsules, scared ghosts, collisions).  Ghosts move like ghostAgents.RandomGhost.
+
+  env = BatchedPacmanEnv(layout.getLayout('smallClassic'), 256, seed=0)
+  observation = env.reset()
+  while True:
+      actions = policy(observation, env.getLegalActions())
+      observation, rewards, dones = env.step(actions)
+      env.reset(dones)
+
+Actions are indices into ACTIONS.  Finished games ignore their actions until
+they are reset.
+"""
+
+import numpy as np
+from game import Directions, Configuration, Grid, BitGrid, gridToArray
+import pacman
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH,
+           Directions.EAST, Directions.WEST, Directions.STOP]
+STOP = 4
+DX = np.array([0, 0, 1, -1, 0])
+DY = np.array([1, -1, 0, 0, 0])
+REVERSE = np.array([1, 0, 3, 2, 4])
+
+
+class BatchedPacmanEnv:
+    """
+    numEnvs games of Pacman on one layout.  The state of game i is
+
+      pacman[i]         Pacman's (x, y)
+      ghosts[i, g]      ghost g's (x, y) in half-cells
+      directions[i, a]  the ACTIONS index agent a last moved in (0 is Pacman)
+      scaredTimers[i, g]
+      food[i, f]        whether foodCells[f] still holds food
+      capsules[i, c]    whether capsuleCells[c] still holds a capsule
+      scores[i], wins[i], losses[i], dones[i]
+    """
+
+    def __init__(self, layout, numEnvs, numGhosts=None, seed=None):
+        self.layout = layout
+        self.numEnvs = numEnvs
+        width, height = layout.width, layout.height
+        # open[x, y, a]: whether ACTIONS[a] from (x, y) stays off the walls
+        walls = np.pad(gridToArray(layout.walls), 1, constant_values=True)
+        self.open = np.stack([~walls[1 + dx:width + 1 + dx, 1 + dy:height + 1 + dy]
+                              for dx, dy in zip(DX, DY)], axis=2)
+
+        self.foodCells = np.array(layout.food.asList(), dtype=int).reshape(-1, 2)
+        self.capsuleCells = np.array(layout.capsules, dtype=int).reshape(-1, 2)
+        self.foodIndex = -np.ones((width, height), dtype=int)
+        self.foodIndex[self.foodCells[:, 0], self.foodCells[:, 1]] = np.arange(len(self.foodCells))
+        self.capsuleIndex = -np.ones((width, height), dtype=int)
+        self.capsuleIndex[self.capsuleCells[:, 0], self.capsuleCells[:, 1]] = np.arange(len(self.capsuleCells))
+
+        starts = [pos for isPacman, pos in layout.agentPositions if not isPacman]
+        if numGhosts != None:
+            starts = starts[:numGhosts]
+        self.numGhosts = len(starts)
+        self.pacmanStart = np.array([pos for isPacman, pos in layout.agentPositions if isPacman][0])
+        self.ghostStarts = 2 * np.array(starts, dtype=int).reshape(-1, 2)
+
+        self.random = np.random.default_rng(seed)
+        self.pacman = np.zeros((numEnvs, 2), dtype=int)
+        self.ghosts = np.zeros((numEnvs, self.numGhosts, 2), dtype=int)
+        self.directions = np.zeros((numEnvs, self.numGhosts + 1), dtype=int)
+        self.scaredTimers = np.zeros((numEnvs, self.numGhosts), dtype=int)
+        self.food = np.zeros((numEnvs, len(self.foodCells)), dtype=bool)
+        self.foodLeft = np.zeros(numEnvs, dtype=int)
+        self.capsules = np.zeros((numEnvs, len(self.capsuleCells)), dtype=bool)
+        self.scores = np.zeros(numEnvs, dtype=int)
+        self.wins = np.zeros(numEnvs, dtype=bool)
+        self.losses = np.zeros(numEnvs, dtype=bool)
+        self.dones = np.zeros(numEnvs, dtype=bool)
+        self.lastGhostActions = np.full((numEnvs, self.numGhosts), STOP)
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Starts new games in the environments selected by the boolean mask
+        (all of them by default) and returns the observation.
+        """
+        index = np.arange(self.numEnvs) if mask is None else np.nonzero(mask)[0]
+        self.pacman[index] = self.pacmanStart
+        self.ghosts[index] = self.ghostStarts
+        self.directions[index] = STOP
+        self.scaredTimers[index] = 0
+        self.food[index] = True
+        self.foodLeft[index] = len(self.foodCells)
+        self.capsules[index] = True
+        self.scores[index] = 0
+        self.wins[index] = False
+        self.losses[index] = False
+        self.dones[index] = False
+        return self.getObservation()
+
+    def getObservation(self):
+        "A dict of copies of the state arrays, with ghosts in whole cells."
+        return {'pacman': self.pacman.copy(), 'ghosts': self.ghosts / 2.0,
+                'directions': self.directions.copy(), 'scaredTimers': self.scaredTimers.copy(),
+                'food': self.food.copy(), 'capsules': self.capsules.copy(),
+                'scores': self.scores.copy(), 'dones': self.dones.copy()}
+
+    def getLegalActions(self):
+        "A (numEnvs, len(ACTIONS)) mask of Pacman's legal actions; none once done."
+        legal = self.open[self.pacman[:, 0], self.pacman[:, 1]]
+        legal[self.dones] = False
+        return legal
+
+    def step(self, actions):
+        """
+        Plays one round in every unfinished game: Pacman takes actions[i] in
+        game i, then the ghosts move.  Returns (observation, rewards, dones),
+        where rewards is the change in score over the round.
+        """
+        actions = np.asarray(actions, dtype=int)
+        rewards = np.zeros(self.numEnvs, dtype=int)
+        index = np.nonzero(~self.dones)[0]
+        self._movePacman(index, actions[index], rewards)
+        for ghost in range(self.numGhosts):
+            index = np.nonzero(~(self.dones | self.wins | self.losses))[0]
+            self._moveGhost(index, ghost, rewards)
+        self.dones |= self.wins | self.losses
+        self.scores += rewards
+        return self.getObservation(), rewards, self.dones.copy()
+
+    def _movePacman(self, index, actions, rewards):
+        x, y = self.pacman[index, 0], self.pacman[index, 1]
+        if not self.open[x, y, actions].all():
+            raise Exception("Illegal action")
+        x, y = x + DX[actions], y + DY[actions]
+        self.pacman[index, 0], self.pacman[index, 1] = x, y
+        moved = actions != STOP
+        self.directions[index[moved], 0] = actions[moved]
+        rewards[index] -= pacman.TIME_PENALTY
+
+        f = self.foodIndex[x, y]
+        ate = f >= 0
+        ate[ate] = self.food[index[ate], f[ate]]
+        eaters = index[ate]
+        self.food[eaters, f[ate]] = False
+        self.foodLeft[eaters] -= 1
+        rewards[eaters] += 10
+        won = eaters[self.foodLeft[eaters] == 0]
+        self.wins[won] = True
+        rewards[won] += 500
+
+        c = self.capsuleIndex[x, y]
+        ate = c >= 0
+        ate[ate] = self.capsules[index[ate], c[ate]]
+        self.capsules[index[ate], c[ate]] = False
+        self.scaredTimers[index[ate]] = pacman.SCARED_TIME
+
+        for ghost in range(self.numGhosts):
+            self._checkDeath(index, ghost, rewards)
+
+    def _moveGhost(self, index, ghost, rewards):
+        gx, gy = self.ghosts[index, ghost, 0], self.ghosts[index, ghost, 1]
+        direction = self.directions[index, ghost + 1]
+        onGrid = (gx % 2 == 0) & (gy % 2 == 0)
+
+        # GhostRules.getLegalActions: no stopping, and no turning back unless
+        # at a dead end; between cells a ghost keeps going
+        legal = self.open[gx // 2, gy // 2].copy()
+        legal[:, STOP] = False
+        reverse = REVERSE[direction]
+        rows = np.arange(len(index))
+        turnBack = legal[rows, reverse] & (legal.sum(1) > 1)
+        legal[rows[turnBack], reverse[turnBack]] = False
+        legal[~onGrid] = False
+        legal[rows[~onGrid], direction[~onGrid]] = True
+
+        # Uniformly among the legal actions, as RandomGhost does
+        draws = self.random.random(legal.shape)
+        draws[~legal] = -1
+        actions = draws.argmax(1)
+        actions[~legal.any(1)] = STOP
+        self.lastGhostActions[index, ghost] = actions
+
+        speed = np.where(self.scaredTimers[index, ghost] > 0, 1, 2)
+        gx, gy = gx + DX[actions] * speed, gy + DY[actions] * speed
+        moved = actions != STOP
+        self.directions[index[moved], ghost + 1] = actions[moved]
+
+        # GhostRules.decrementTimer snaps a ghost back onto the grid as it
+        # stops being scared
+        timers = self.scaredTimers[index, ghost]
+        snap = timers == 1
+        gx[snap], gy[snap] = gx[snap] + gx[snap] % 2, gy[snap] + gy[snap] % 2
+        self.scaredTimers[index, ghost] = np.maximum(0, timers - 1)
+        self.ghosts[index, ghost, 0], self.ghosts[index, ghost, 1] = gx, gy
+
+        self._checkDeath(index, ghost, rewards)
+
+    def _checkDeath(self, index, ghost, rewards):
+        # Within COLLISION_TOLERANCE (0.7 cells) means at most one half-cell
+        distance = (np.abs(self.ghosts[index, ghost, 0] - 2 * self.pacman[index, 0]) +
+                    np.abs(self.ghosts[index, ghost, 1] - 2 * self.pacman[index, 1]))
+        hit = index[distance <= 2 * pacman.COLLISION_TOLERANCE]
+        scared = self.scaredTimers[hit, ghost] > 0
+        eaten = hit[scared]
+        rewards[eaten] += 200
+        self.ghosts[eaten, ghost] = self.ghostStarts[ghost]
+        self.directions[eaten, ghost + 1] = STOP
+        self.scaredTimers[eaten, ghost] = 0
+        killers = hit[~scared]
+        killers = killers[~self.wins[killers]]
+        rewards[killers] -= 500
+        self.losses[killers] = True
+
+    def getGameState(self, i):
+        """
+        Returns game i as a pacman.GameState, for feature extractors and
+        other code written against GameStates.
+        """
+        state = pacman.GameState()
+        state.initialize(self.layout, self.numGhosts)
+        data = state.data
+        directions = [ACTIONS[d] for d in self.directions[i]]
+        data.agentStates[0].configuration = Configuration(
+            tuple(int(v) for v in self.pacman[i]), directions[0])
+        for g in range(self.numGhosts):
+            agentState = data.agentStates[g + 1]
+            x, y = self.ghosts[i, g] / 2.0
+            if x == int(x) and y == int(y):
+                x, y = int(x), int(y)
+            agentState.configuration = Configuration((x, y), directions[g + 1])
+            agentState.scaredTimer = int(self.scaredTimers[i, g])
+        food = Grid(self.layout.width, self.layout.height)
+        for x, y in self.foodCells[self.food[i]]:
+            food[int(x)][int(y)] = True
+        data.food = BitGrid.fromGrid(food)
+        data.capsules = [tuple(int(v) for v in cell)
+                         for cell in self.capsuleCells[self.capsules[i]]]
+        data.score = int(self.scores[i])
+        data._win = bool(self.wins[i])
+        data._lose = bool(self.losses[i])
+        return state
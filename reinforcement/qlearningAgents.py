@@ -101,7 +101,7 @@ class QLearningAgent(ReinforcementAgent):
                 bestActions.append(action)
         
         # Break ties randomly
-        return random.choice(bestActions)
+        return self.random.choice(bestActions)
 
     def getAction(self, state):
         """
@@ -121,9 +121,9 @@ class QLearningAgent(ReinforcementAgent):
             return None
         
         # Epsilon-greedy action selection
-        if util.flipCoin(self.epsilon):
+        if util.flipCoin(self.epsilon, self.random):
             # Explore: choose random action
-            action = random.choice(legalActions)
+            action = self.random.choice(legalActions)
         else:
             # Exploit: choose best action according to Q-values
             action = self.computeActionFromQValues(state)
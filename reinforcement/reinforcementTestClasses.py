@@ -687,7 +687,7 @@ class EvalAgentTest(testClasses.TestCase):
         self.addMessage('Grading agent using command:  python pacman.py %s'% (self.pacmanParams,))
 
         startTime = time.time()
-        games = pacman.runGames(** pacman.readCommand(self.pacmanParams.split(' ')))
+        games = pacman.runGamesWithOptions(** pacman.readCommand(self.pacmanParams.split(' ')))
         totalTime = time.time() - startTime
         numGames = len(games)
 
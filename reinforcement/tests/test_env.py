@@ -0,0 +1,45 @@
+import importlib
+import os
+import sys
+
+import numpy as np
+
+REINFORCEMENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REINFORCEMENT_DIR not in sys.path:
+    sys.path.insert(0, REINFORCEMENT_DIR)
+
+
+def test_batched_env_follows_the_game_rules():
+    layout = importlib.import_module('layout')
+    pacmanEnv = importlib.import_module('pacmanEnv')
+    env = pacmanEnv.BatchedPacmanEnv(layout.getLayout('smallClassic'), 16, seed=0)
+    states = [env.getGameState(i) for i in range(env.numEnvs)]
+    rng = np.random.default_rng(1)
+    finished = scared = 0
+    for _ in range(300):
+        legal = env.getLegalActions()
+        actions = np.array([rng.choice(np.nonzero(row)[0]) if row.any() else 0 for row in legal])
+        _, rewards, dones = env.step(actions)
+        for i in range(env.numEnvs):
+            # Replay the round the env played through GameState's rules
+            state = states[i].generateSuccessor(0, pacmanEnv.ACTIONS[actions[i]])
+            for ghost in range(env.numGhosts):
+                if state.isWin() or state.isLose(): break
+                state = state.generateSuccessor(ghost + 1, pacmanEnv.ACTIONS[env.lastGhostActions[i, ghost]])
+            mirror = env.getGameState(i)
+            assert state.getScore() == mirror.getScore() == states[i].getScore() + rewards[i]
+            assert state.getPacmanPosition() == mirror.getPacmanPosition()
+            assert state.getGhostPositions() == mirror.getGhostPositions()
+            assert [g.scaredTimer for g in state.getGhostStates()] == [g.scaredTimer for g in mirror.getGhostStates()]
+            assert state.getFood() == mirror.getFood()
+            assert state.getCapsules() == mirror.getCapsules()
+            assert (state.isWin(), state.isLose()) == (mirror.isWin(), mirror.isLose()) == (env.wins[i], env.losses[i])
+            states[i] = state
+            finished += dones[i]
+            scared += env.scaredTimers[i].any()
+        done = dones.copy()
+        env.reset(done)
+        assert not env.dones.any() and (env.scores[done] == 0).all()
+        for i in np.nonzero(done)[0]:
+            states[i] = env.getGameState(i)
+    assert finished > 0 and scared > 0
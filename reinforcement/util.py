@@ -522,10 +522,10 @@ def normalize(vectorOrCounter):
         return [el / s for el in vector]
 
 
-def nSample(distribution, values, n):
+def nSample(distribution, values, n, rng=random):
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
+    rand = [rng.random() for i in range(n)]
     rand.sort()
     samples = []
     samplePos, distPos, cdf = 0, 0, distribution[0]
@@ -539,14 +539,14 @@ def nSample(distribution, values, n):
     return samples
 
 
-def sample(distribution, values=None):
+def sample(distribution, values=None, rng=random):
     if type(distribution) == Counter:
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    choice = random.random()
+    choice = rng.random()
     i, total = 0, distribution[0]
     while choice > total:
         i += 1
@@ -554,9 +554,9 @@ def sample(distribution, values=None):
     return values[i]
 
 
-def sampleFromCounter(ctr):
+def sampleFromCounter(ctr, rng=random):
     items = sorted(ctr.items())
-    return sample([v for k, v in items], [k for k, v in items])
+    return sample([v for k, v in items], [k for k, v in items], rng)
 
 
 def getProbability(value, distribution, values):
@@ -571,16 +571,16 @@ def getProbability(value, distribution, values):
     return total
 
 
-def flipCoin(p):
-    r = random.random()
+def flipCoin(p, rng=random):
+    r = rng.random()
     return r < p
 
 
-def chooseFromDistribution(distribution):
+def chooseFromDistribution(distribution, rng=random):
     "Takes either a counter or a list of (prob, key) pairs and samples"
     if type(distribution) == dict or type(distribution) == Counter:
-        return sample(distribution)
-    r = random.random()
+        return sample(distribution, rng=rng)
+    r = rng.random()
     base = 0.0
     for prob, element in distribution:
         base += prob
@@ -668,14 +668,16 @@ def pause():
 
 # code to handle timeouts
 #
-# FIXME
-# NOTE: TimeoutFuncton is NOT reentrant.  Later timeouts will silently
-# disable earlier timeouts.  Could be solved by maintaining a global list
-# of active time outs.  Currently, questions which have test cases calling
-# this have all student code so wrapped.
+# Timeouts are enforced by one watchdog thread per process, which raises
+# TimeoutFunctionException in whichever thread overran its deadline.  Unlike
+# SIGALRM this works off the main thread, has sub-second resolution and
+# nests: every TimeoutFunction call keeps its own deadline.
 #
+import os
 import signal
+import threading
 import time
+import ctypes
 
 
 class TimeoutFunctionException(Exception):
@@ -683,32 +685,135 @@ class TimeoutFunctionException(Exception):
     pass
 
 
+def _raiseInThread(threadId, exceptionType):
+    """
+    Schedules exceptionType to be raised in the thread threadId the next time
+    it runs Python code; None cancels a scheduled exception.
+    """
+    if exceptionType != None:
+        exceptionType = ctypes.py_object(exceptionType)
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(threadId), exceptionType)
+
+
+def _raiseTimeout(signum, frame):
+    raise TimeoutFunctionException()
+
+
+class Watchdog:
+    """
+    A daemon thread that interrupts calls running past their deadline, for
+    threads that cannot receive SIGALRM.  The exception is delivered between
+    Python bytecodes, so a call blocked inside a long C function (such as
+    time.sleep) is interrupted once it returns.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.deadlines = []   # heap of (deadline, token)
+        self.armed = {}       # token -> id of the thread to interrupt
+        self.nextToken = 0
+        self.pid = os.getpid()
+        self.thread = threading.Thread(
+            target=self._watch, name='TimeoutWatchdog')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def arm(self, seconds):
+        "Starts a deadline for the calling thread and returns its token."
+        with self.condition:
+            token = self.nextToken
+            self.nextToken += 1
+            self.armed[token] = threading.get_ident()
+            heapq.heappush(self.deadlines,
+                           (time.perf_counter() + seconds, token))
+            if self.deadlines[0][1] == token:
+                self.condition.notify()
+        return token
+
+    def disarm(self, token):
+        """
+        Ends the deadline token.  Raises TimeoutFunctionException if it had
+        already fired, cancelling the exception if it has not been delivered.
+        """
+        with self.condition:
+            fired = self.armed.pop(token, None) == None
+        if fired:
+            _raiseInThread(threading.get_ident(), None)
+            raise TimeoutFunctionException()
+
+    def _watch(self):
+        with self.condition:
+            while True:
+                while (len(self.deadlines) > 0 and
+                       self.deadlines[0][1] not in self.armed):
+                    heapq.heappop(self.deadlines)
+                if len(self.deadlines) == 0:
+                    self.condition.wait()
+                    continue
+                deadline, token = self.deadlines[0]
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                heapq.heappop(self.deadlines)
+                _raiseInThread(self.armed.pop(token),
+                               TimeoutFunctionException)
+
+    _instance = None
+
+    def get():
+        "The process's watchdog, started on first use (and again after a fork)."
+        watchdog = Watchdog._instance
+        if watchdog == None or watchdog.pid != os.getpid():
+            watchdog = Watchdog._instance = Watchdog()
+        return watchdog
+    get = staticmethod(get)
+
+
 class TimeoutFunction:
-    def __init__(self, function, timeout):
+    """
+    Calls function, raising TimeoutFunctionException if it runs for more than
+    timeout seconds (which may be fractional); a timeout <= 0 means no limit.
+    On the main thread the call is interrupted by SIGALRM, elsewhere by the
+    Watchdog.  With measureOnly the call is never interrupted; it is only
+    timed, and the exception raised after it returns late, which costs no
+    more than reading the clock twice.  Either way the duration of the last
+    call is left in elapsed.
+    """
+
+    def __init__(self, function, timeout, measureOnly=False):
         self.timeout = timeout
         self.function = function
-
-    def handle_timeout(self, signum, frame):
-        raise TimeoutFunctionException()
+        self.measureOnly = measureOnly
+        self.elapsed = 0.0
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
-            old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+        startTime = time.perf_counter()
+        if self.measureOnly or self.timeout <= 0:
+            result = self.function(*args, **keyArgs)
+            self.elapsed = time.perf_counter() - startTime
+            if self.timeout > 0 and self.elapsed >= self.timeout:
+                raise TimeoutFunctionException()
+            return result
+        if (hasattr(signal, 'SIGALRM') and
+                threading.current_thread() is threading.main_thread()):
+            old = signal.signal(signal.SIGALRM, _raiseTimeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
             try:
                 result = self.function(*args, **keyArgs)
             finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
-        else:
-            startTime = time.time()
+                self.elapsed = time.perf_counter() - startTime
+            return result
+        watchdog = Watchdog.get()
+        token = watchdog.arm(self.timeout)
+        try:
             result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
-            if timeElapsed >= self.timeout:
-                self.handle_timeout(None, None)
+        finally:
+            self.elapsed = time.perf_counter() - startTime
+            watchdog.disarm(token)
         return result
 
 
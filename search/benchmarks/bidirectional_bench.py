@@ -0,0 +1,78 @@
+"""
+Nodes expanded by the point-to-point searches.
+
+For each layout, solves the maze's own start/goal problem and a set of random
+open-cell pairs with bfs, bibfs, astar, biastar and jps (the last three with
+the Manhattan heuristic), and reports path cost and nodes expanded.  Backward
+expansions of the bidirectional searches (getPredecessors calls) are counted
+as well, and jps counts jump points expanded.
+
+> python benchmarks/bidirectional_bench.py [-n PAIRS] [-s SEED] [layoutName ...]
+"""
+
+import os
+import random
+import sys
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+import layout
+import pacman
+import search
+import searchAgents
+
+ALGORITHMS = [
+    ('bfs', search.bfs, False),
+    ('bibfs', search.bibfs, False),
+    ('astar', search.astar, True),
+    ('biastar', search.biastar, True),
+    ('jps', search.jps, True),
+]
+
+
+def loadState(layoutName):
+    lay = layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', layoutName + '.lay'))
+    if lay == None: raise Exception("The layout " + layoutName + " cannot be found")
+    state = pacman.GameState()
+    state.initialize(lay, 0)
+    return state
+
+
+def solve(state, fn, useHeuristic, start=None, goal=(1, 1)):
+    problem = searchAgents.PositionSearchProblem(state, start=start, goal=goal, warn=False, visualize=False)
+    if useHeuristic:
+        path = fn(problem, heuristic=searchAgents.manhattanHeuristic)
+    else:
+        path = fn(problem)
+    return problem.getCostOfActions(path), problem._expanded
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser('python benchmarks/bidirectional_bench.py [options] [layout ...]')
+    parser.add_option('-n', '--pairs', type='int', dest='pairs', default=100,
+                      help='random start/goal pairs per layout [Default: %default]')
+    parser.add_option('-s', '--seed', type='int', dest='seed', default=0,
+                      help='seed for the random pairs [Default: %default]')
+    options, layouts = parser.parse_args(argv)
+    layouts = layouts or ['bigMaze', 'openMaze', 'bigSearch']
+    rng = random.Random(options.seed)
+
+    print('%-10s %-8s %6s %9s %14s' % ('layout', 'search', 'cost', 'expanded', 'pairs (mean)'))
+    for layoutName in layouts:
+        state = loadState(layoutName)
+        walls = state.getWalls()
+        cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(options.pairs)]
+        for name, fn, useHeuristic in ALGORITHMS:
+            cost, expanded = solve(state, fn, useHeuristic)
+            total = 0
+            for start, goal in pairs:
+                total += solve(state, fn, useHeuristic, start, goal)[1]
+            print('%-10s %-8s %6d %9d %14.1f' % (layoutName, name, cost, expanded, total / float(len(pairs))))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
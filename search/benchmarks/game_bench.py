@@ -0,0 +1,102 @@
+"""
+Benchmark for game-state copying and full-game throughput.
+
+Times GameState.deepCopy and plays headless games (NullGraphics, fixed
+seeds), reporting moves per second.  Each measurement is taken twice: with
+the legacy behaviour, where every state copy re-parses the layout text, and
+with the current shared, immutable layout.
+
+> python benchmarks/game_bench.py [-l LAYOUT] [-n GAMES] [-p AGENT]
+"""
+
+import os
+import random
+import sys
+import time
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+import game
+import ghostAgents
+import layout
+import pacman
+import pacmanAgents
+import textDisplay
+
+
+def legacyLayoutCopies():
+    "Patches GameStateData.deepCopy to re-parse the layout, as it used to"
+    current = game.GameStateData.deepCopy
+    def deepCopy(self):
+        state = current(self)
+        state.layout = layout.Layout(self.layout.layoutText[:])
+        # Only the re-parse is legacy; the action table came later and is
+        # carried over, or every copy would also pay for rebuilding it
+        state.layout.actionTable = self.layout.getActionTable()
+        return state
+    game.GameStateData.deepCopy = deepCopy
+    return lambda: setattr(game.GameStateData, 'deepCopy', current)
+
+
+def timeDeepCopy(lay, copies):
+    state = pacman.GameState()
+    state.initialize(lay, lay.getNumGhosts())
+    start = time.perf_counter()
+    for _ in range(copies):
+        state.deepCopy()
+    return copies / (time.perf_counter() - start)
+
+
+def timeGames(lay, agentName, numGames, seed):
+    rules = pacman.ClassicGameRules()
+    moves, elapsed = 0, 0.0
+    for i in range(numGames):
+        random.seed('%s-%d' % (seed, i))
+        pac = getattr(pacmanAgents, agentName)()
+        ghosts = [ghostAgents.RandomGhost(j + 1) for j in range(lay.getNumGhosts())]
+        g = rules.newGame(lay, pac, ghosts, textDisplay.NullGraphics(), quiet=True)
+        start = time.perf_counter()
+        g.run()
+        elapsed += time.perf_counter() - start
+        moves += len(g.moveHistory)
+    return moves, moves / elapsed
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser('python benchmarks/game_bench.py [options]')
+    parser.add_option('-l', '--layout', dest='layout', default='originalClassic',
+                      help='layout to play [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=5,
+                      help='games per measurement [Default: %default]')
+    parser.add_option('-p', '--pacman', dest='pacman', default='GreedyAgent',
+                      help='agent in pacmanAgents.py [Default: %default]')
+    parser.add_option('-c', '--copies', dest='copies', type='int', default=2000,
+                      help='deepCopy calls to time [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', default='cs188',
+                      help='base random seed [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+
+    lay = layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', options.layout + '.lay'))
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+
+    results = {}
+    for mode in ['legacy', 'shared']:
+        restore = legacyLayoutCopies() if mode == 'legacy' else (lambda: None)
+        try:
+            copyRate = timeDeepCopy(lay, options.copies)
+            moves, moveRate = timeGames(lay, options.pacman, options.numGames, options.seed)
+        finally:
+            restore()
+        results[mode] = (copyRate, moveRate)
+        print('%-7s deepCopy/s: %10.0f   moves: %6d   moves/s: %8.0f' % (mode, copyRate, moves, moveRate))
+    print('speedup  deepCopy: %.2fx   moves/s: %.2fx' % (
+        results['shared'][0] / results['legacy'][0], results['shared'][1] / results['legacy'][1]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for the FIFO queue behind breadthFirstSearch.
+
+Runs BFS on bigMaze and openMaze twice: once with the legacy list-backed
+queue (insert at the front, O(n) per push) and once with util.Queue.  The
+frontiers of these mazes stay small, so a raw push/pop loop at a larger
+frontier size is timed as well to show the asymptotic difference.
+
+> python benchmarks/queue_bench.py [-r REPEATS] [layoutName ...]
+"""
+
+import os
+import sys
+import time
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+import layout
+import pacman
+import search
+import searchAgents
+import util
+
+
+class ListQueue:
+    "The original list-backed Queue, kept here as the 'before' baseline."
+    def __init__(self):
+        self.list = []
+
+    def push(self, item):
+        self.list.insert(0, item)
+
+    def pop(self):
+        return self.list.pop()
+
+    def isEmpty(self):
+        return len(self.list) == 0
+
+    def __len__(self):
+        return len(self.list)
+
+
+def loadProblem(layoutName):
+    lay = layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', layoutName + '.lay'))
+    if lay == None: raise Exception("The layout " + layoutName + " cannot be found")
+    state = pacman.GameState()
+    state.initialize(lay, 0)
+    return lambda: searchAgents.PositionSearchProblem(state, warn=False, visualize=False)
+
+
+def timeBfs(makeProblem, queueClass, repeats):
+    original = search.Queue
+    search.Queue = queueClass
+    try:
+        best = None
+        for _ in range(repeats):
+            problem = makeProblem()
+            start = time.perf_counter()
+            path = search.breadthFirstSearch(problem)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(path), problem._expanded
+    finally:
+        search.Queue = original
+
+
+def timeFill(queueClass, size):
+    queue = queueClass()
+    start = time.perf_counter()
+    for i in range(size):
+        queue.push(i)
+    while not queue.isEmpty():
+        queue.pop()
+    return time.perf_counter() - start
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser('python benchmarks/queue_bench.py [options] [layout ...]')
+    parser.add_option('-r', '--repeats', type='int', dest='repeats', default=5,
+                      help='best-of-N timing [Default: %default]')
+    parser.add_option('-s', '--fillSize', type='int', dest='fillSize', default=100000,
+                      help='frontier size for the raw push/pop loop [Default: %default]')
+    options, layouts = parser.parse_args(argv)
+    layouts = layouts or ['bigMaze', 'openMaze']
+
+    print('%-12s %8s %8s %12s %12s %8s' % ('layout', 'cost', 'expanded', 'list (ms)', 'deque (ms)', 'speedup'))
+    for layoutName in layouts:
+        makeProblem = loadProblem(layoutName)
+        before, cost, expanded = timeBfs(makeProblem, ListQueue, options.repeats)
+        after, _, _ = timeBfs(makeProblem, util.Queue, options.repeats)
+        print('%-12s %8d %8d %12.2f %12.2f %7.2fx' % (layoutName, cost, expanded,
+              before * 1000, after * 1000, before / after))
+
+    before, after = timeFill(ListQueue, options.fillSize), timeFill(util.Queue, options.fillSize)
+    print('%-21s %8d %12.2f %12.2f %7.2fx' % ('push/pop fill', options.fillSize,
+          before * 1000, after * 1000, before / after))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
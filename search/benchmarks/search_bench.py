@@ -0,0 +1,265 @@
+"""
+Benchmark suite for the search algorithms.
+
+Runs every algorithm in search.py on every problem in searchAgents.py
+(PositionSearchProblem, CornersProblem, FoodSearchProblem and
+AnyFoodSearchProblem) and every layout in layouts/, recording path cost, nodes
+expanded, wall time and tracemalloc peak memory from SearchStats.  A run that
+exceeds the expansion or time budget is stopped and reported as 'budget'.
+
+Results are compared with a stored baseline and the script exits with status 1
+if any run regressed by more than the thresholds: a run that no longer
+finishes, a costlier path or more expansions.  Those are deterministic, so
+the committed baseline holds only them.  Times and memory depend on the
+machine: they are saved only with --timings, for a baseline kept on one
+machine, and compared only when the baseline has them.
+
+> python benchmarks/search_bench.py                  # compare with the baseline
+> python benchmarks/search_bench.py --save           # record a new baseline
+> python benchmarks/search_bench.py --save --timings -b local.json
+> python benchmarks/search_bench.py -a astar,jps -p PositionSearchProblem -l bigMaze,openMaze
+"""
+
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+import layout
+import pacman
+import search
+import searchAgents
+
+DEFAULT_BASELINE = os.path.join(SEARCH_DIR, 'benchmarks', 'search_baseline.json')
+# Result fields that depend on the machine, kept out of baselines by default
+MACHINE_FIELDS = ('time', 'memory')
+
+# (abbreviation, takes a heuristic, needs a point-to-point problem)
+ALGORITHMS = [
+    ('dfs', False, False),
+    ('bfs', False, False),
+    ('ucs', False, False),
+    ('astar', True, False),
+    ('idastar', True, False),
+    ('smastar', True, False),
+    ('bibfs', False, True),
+    ('biastar', True, True),
+    ('jps', True, True),
+]
+
+# Problem class name -> heuristic used by the informed searches
+PROBLEMS = [
+    ('PositionSearchProblem', 'manhattanHeuristic'),
+    ('CornersProblem', 'cornersHeuristic'),
+    ('FoodSearchProblem', 'foodHeuristic'),
+    ('AnyFoodSearchProblem', 'nullHeuristic'),
+]
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class BudgetedProblem:
+    """
+    Forwards everything to a search problem, but raises BudgetExceeded once
+    more than maxExpansions states are expanded or the deadline passes.
+    Every algorithm reports its expansions through SearchStats.record, which
+    calls chargeExpansion, so searches that never call getSuccessors (jps)
+    are budgeted too.
+    """
+    def __init__(self, problem, maxExpansions, timeLimit):
+        self.problem = problem
+        self.maxExpansions = maxExpansions
+        self.deadline = time.perf_counter() + timeLimit
+        self.calls = 0
+
+    def chargeExpansion(self):
+        self.calls += 1
+        if self.calls > self.maxExpansions or time.perf_counter() > self.deadline:
+            raise BudgetExceeded()
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+
+def layoutNames():
+    return sorted(name[:-4] for name in os.listdir(os.path.join(SEARCH_DIR, 'layouts')) if name.endswith('.lay'))
+
+
+def loadState(layoutName):
+    lay = layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', layoutName + '.lay'))
+    if lay == None: raise Exception("The layout " + layoutName + " cannot be found")
+    state = pacman.GameState()
+    state.initialize(lay, 0)
+    return state
+
+
+def isApplicable(algorithm, problemName, state):
+    _, _, pointToPoint = algorithm
+    if problemName == 'PositionSearchProblem':
+        return not state.hasWall(1, 1)
+    return not pointToPoint
+
+
+def runOnce(algorithm, problemName, heuristicName, state, options, traceMemory):
+    name, usesHeuristic, _ = algorithm
+    fn = getattr(search, name)
+    kwargs = {}
+    if usesHeuristic:
+        kwargs['heuristic'] = getattr(searchAgents, heuristicName, None) or getattr(search, heuristicName)
+    search.SearchStats.traceMemory = traceMemory
+    try:
+        with redirect_stdout(io.StringIO()):
+            problem = getattr(searchAgents, problemName)(state)
+            budgeted = BudgetedProblem(problem, options.maxExpansions, options.timeLimit)
+            try:
+                path = fn(budgeted, **kwargs)
+            except BudgetExceeded:
+                return {'status': 'budget', 'expanded': budgeted.calls}
+            cost = problem.getCostOfActions(path)
+    finally:
+        search.SearchStats.traceMemory = False
+        # Never let tracing leak into the runs timed after this one
+        if traceMemory and tracemalloc.is_tracing(): tracemalloc.stop()
+    stats = budgeted.searchStats
+    return {'status': 'ok', 'cost': cost, 'expanded': stats.expanded,
+            'time': stats.wallTime, 'memory': stats.memoryPeak}
+
+
+def runMatrix(algorithms, problems, layouts, options, log=None):
+    results = {}
+    for layoutName in layouts:
+        state = loadState(layoutName)
+        for problemName, heuristicName in problems:
+            for algorithm in algorithms:
+                if not isApplicable(algorithm, problemName, state):
+                    continue
+                key = '%s/%s/%s' % (algorithm[0], problemName, layoutName)
+                try:
+                    result = runOnce(algorithm, problemName, heuristicName, state, options, False)
+                    for _ in range(options.repeats - 1):
+                        if result['status'] != 'ok': break
+                        again = runOnce(algorithm, problemName, heuristicName, state, options, False)
+                        result['time'] = min(result['time'], again['time'])
+                    if result['status'] == 'ok' and options.memory:
+                        # Tracing is slow, so the traced run may run out of budget
+                        traced = runOnce(algorithm, problemName, heuristicName, state, options, True)
+                        if traced['status'] == 'ok': result['memory'] = traced['memory']
+                except Exception as e:
+                    result = {'status': 'error', 'error': '%s: %s' % (type(e).__name__, e)}
+                results[key] = result
+                if log != None: log(key, result)
+    return results
+
+
+def compare(baseline, results, threshold=0.25, timeThreshold=0.5, minTime=0.005, minMemory=65536):
+    """
+    Returns a list of messages, one per run of results that regressed
+    against baseline.  Runs missing from the baseline are not regressions,
+    and times and memory are only compared where the baseline has them.
+    """
+    regressions = []
+    for key in sorted(results):
+        if key not in baseline: continue
+        old, new = baseline[key], results[key]
+        if old['status'] == 'ok' and new['status'] != 'ok':
+            regressions.append('%s: %s (was ok)' % (key, new['status']))
+            continue
+        if old['status'] != 'ok' or new['status'] != 'ok':
+            continue
+        if new['cost'] > old['cost']:
+            regressions.append('%s: cost %s > %s' % (key, new['cost'], old['cost']))
+        if new['expanded'] > old['expanded'] * (1 + threshold):
+            regressions.append('%s: expanded %d > %d' % (key, new['expanded'], old['expanded']))
+        if old.get('time') != None and new['time'] > old['time'] * (1 + timeThreshold) and new['time'] - old['time'] > minTime:
+            regressions.append('%s: time %.1fms > %.1fms' % (key, new['time'] * 1000, old['time'] * 1000))
+        if new.get('memory') != None and old.get('memory') != None:
+            if new['memory'] > old['memory'] * (1 + threshold) and new['memory'] - old['memory'] > minMemory:
+                regressions.append('%s: memory %dKB > %dKB' % (key, new['memory'] // 1024, old['memory'] // 1024))
+    return regressions
+
+
+def formatResult(key, result):
+    if result['status'] != 'ok':
+        return '%-50s %-7s %s' % (key, result['status'], result.get('error', ''))
+    memory = '-' if result.get('memory') == None else '%d' % (result['memory'] // 1024)
+    return '%-50s %-7s %8s %9d %10.1f %9s' % (key, 'ok', result['cost'], result['expanded'], result['time'] * 1000, memory)
+
+
+def selected(option, choices):
+    if option == None: return choices
+    wanted = option.split(',')
+    return [choice for choice in choices if (choice if isinstance(choice, str) else choice[0]) in wanted]
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser('python benchmarks/search_bench.py [options]')
+    parser.add_option('-a', '--algorithms', dest='algorithms', default=None,
+                      help='comma-separated search.py abbreviations [Default: all]')
+    parser.add_option('-p', '--problems', dest='problems', default=None,
+                      help='comma-separated problem classes [Default: all]')
+    parser.add_option('-l', '--layouts', dest='layouts', default=None,
+                      help='comma-separated layout names [Default: all in layouts/]')
+    parser.add_option('-b', '--baseline', dest='baseline', default=DEFAULT_BASELINE,
+                      help='baseline JSON file [Default: %default]')
+    parser.add_option('--save', action='store_true', dest='save', default=False,
+                      help='write the results as the new baseline instead of comparing')
+    parser.add_option('--timings', action='store_true', dest='timings', default=False,
+                      help='also save wall time and memory, which only hold on this machine')
+    parser.add_option('-t', '--threshold', type='float', dest='threshold', default=0.25,
+                      help='allowed relative growth of expansions and memory [Default: %default]')
+    parser.add_option('--timeThreshold', type='float', dest='timeThreshold', default=0.5,
+                      help='allowed relative growth of wall time [Default: %default]')
+    parser.add_option('-e', '--maxExpansions', type='int', dest='maxExpansions', default=50000,
+                      help='expansion budget per run [Default: %default]')
+    parser.add_option('-s', '--timeLimit', type='float', dest='timeLimit', default=2.0,
+                      help='time budget per run in seconds [Default: %default]')
+    parser.add_option('-r', '--repeats', type='int', dest='repeats', default=1,
+                      help='best-of-N timing [Default: %default]')
+    parser.add_option('--noMemory', action='store_false', dest='memory', default=True,
+                      help='skip the traced run that measures peak memory')
+    options, _ = parser.parse_args(argv)
+
+    algorithms = selected(options.algorithms, ALGORITHMS)
+    problems = selected(options.problems, PROBLEMS)
+    layouts = selected(options.layouts, layoutNames())
+
+    print('%-50s %-7s %8s %9s %10s %9s' % ('run', 'status', 'cost', 'expanded', 'time (ms)', 'mem (KB)'))
+    results = runMatrix(algorithms, problems, layouts, options,
+                        lambda key, result: print(formatResult(key, result)))
+
+    if options.save:
+        baseline = {}
+        if os.path.exists(options.baseline):
+            with open(options.baseline) as f: baseline = json.load(f)
+        for key, result in results.items():
+            if not options.timings:
+                result = dict((field, value) for field, value in result.items() if field not in MACHINE_FIELDS)
+            baseline[key] = result
+        with open(options.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print('Saved %d runs to %s' % (len(results), options.baseline))
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print('No baseline at %s; run with --save to record one' % options.baseline)
+        return 0
+    with open(options.baseline) as f: baseline = json.load(f)
+    regressions = compare(baseline, results, options.threshold, options.timeThreshold)
+    for message in regressions:
+        print('REGRESSION ' + message)
+    print('%d runs, %d regressions' % (len(results), len(regressions)))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
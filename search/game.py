@@ -23,8 +23,14 @@
 from util import *
 import time, os
 import traceback
+import random
 import sys
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 #######################
 # Parts worth reading #
 #######################
@@ -35,7 +41,13 @@ class Agent:
     following methods which will be called if they exist:
 
     def registerInitialState(self, state): # inspects the starting state
+
+    Agents draw random numbers from self.random: the random stream of the last
+    game played that had one, which Game sets, and otherwise the random module
+    or a stream of the agent's own.
     """
+    random = random
+
     def __init__(self, index=0):
         self.index = index
 
@@ -216,6 +228,12 @@ class Grid:
         g.data = self.data
         return g
 
+    def withCell(self, x, y, value):
+        "Returns a copy of this grid with (x,y) set to value"
+        g = self.copy()
+        g[x][y] = value
+        return g
+
     def count(self, item =True ):
         return sum([x.count(item) for x in self.data])
 
@@ -280,6 +298,300 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation= bitRep[2:])
 
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+class BitGridColumn:
+    """
+    A live view of one column of a BitGrid, so grid[x][y] reads and
+    grid[x][y] = value writes work exactly as they do on a Grid.
+    """
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.offset = x * grid.height
+
+    def __getitem__(self, y):
+        height = self.grid.height
+        if y < 0: y += height
+        if not 0 <= y < height: raise IndexError('grid index out of range')
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        height = self.grid.height
+        if y < 0: y += height
+        if not 0 <= y < height: raise IndexError('grid index out of range')
+        self.grid.setBit(self.offset + y, value)
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        return iter([self[y] for y in range(self.grid.height)])
+
+    def count(self, item=True):
+        mask = ((1 << self.grid.height) - 1) << self.offset
+        ones = _popcount(self.grid.bits & mask)
+        return ones if item else self.grid.height - ones
+
+class BitGrid:
+    """
+    A boolean Grid packed into a single Python int.  Cell (x,y) is bit
+    x * height + y, the same ordering Grid uses for hashing and packBits, so
+    a BitGrid hashes and compares equal to a Grid with the same contents.
+
+    Because ints are immutable, copy() is O(1) and copies never share
+    writes; count() is a popcount and the hash is cached until the next
+    write.  grid[x][y] indexing is supported through BitGridColumn views.
+    """
+    def __init__(self, width, height, initialValue=False, bits=0):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.width = width
+        self.height = height
+        if initialValue:
+            bits = (1 << (width * height)) - 1
+        self.bits = bits
+        self._hash = None
+
+    def fromGrid(grid):
+        "Packs any object with width, height and [x][y] booleans into a BitGrid"
+        if isinstance(grid, BitGrid): return grid.copy()
+        bits, bit = 0, 1
+        for x in range(grid.width):
+            column = grid[x]
+            for y in range(grid.height):
+                if column[y]: bits |= bit
+                bit <<= 1
+        return BitGrid(grid.width, grid.height, bits=bits)
+    fromGrid = staticmethod(fromGrid)
+
+    def toGrid(self):
+        g = Grid(self.width, self.height)
+        g.data = self.data
+        return g
+
+    def __getitem__(self, x):
+        if x < 0: x += self.width
+        if not 0 <= x < self.width: raise IndexError('grid index out of range')
+        return BitGridColumn(self, x)
+
+    def __setitem__(self, x, column):
+        view = self[x]
+        for y, value in enumerate(column):
+            view[y] = value
+
+    def getBit(self, index):
+        return (self.bits >> index) & 1 == 1
+
+    def setBit(self, index, value):
+        if value:
+            self.bits |= 1 << index
+        else:
+            self.bits &= ~(1 << index)
+        self._hash = None
+
+    def withCell(self, x, y, value):
+        "Returns a copy of this grid with (x,y) set to value"
+        g = self.copy()
+        g.setBit(x * self.height + y, value)
+        return g
+
+    def data(self):
+        "A list-of-lists snapshot, for code written against Grid.data"
+        return [[(self.bits >> (x * self.height + y)) & 1 == 1 for y in range(self.height)]
+                for x in range(self.width)]
+    data = property(data)
+
+    def __str__(self):
+        out = [[str(self.getBit(x * self.height + y))[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.width == other.width and self.height == other.height
+        return self.data == other.data
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.bits)
+        return self._hash
+
+    def copy(self):
+        g = BitGrid(self.width, self.height, bits=self.bits)
+        g._hash = self._hash
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        return self.copy()
+
+    def count(self, item =True ):
+        ones = _popcount(self.bits)
+        return ones if item else self.width * self.height - ones
+
+    def asList(self, key = True):
+        bits = self.bits if key else ~self.bits & ((1 << (self.width * self.height)) - 1)
+        height = self.height
+        list = []
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            list.append( (index // height, index % height) )
+            bits ^= low
+        return list
+
+    def packBits(self):
+        return self.toGrid().packBits()
+
+class ArrayGrid:
+    """
+    A boolean Grid backed by a NumPy array of shape (width, height), so
+    array[x, y] is the cell at (x,y).  grid[x][y] indexing works as it does
+    on a Grid, and asArray() exposes the underlying array without copying
+    for code that wants to work on whole boards at once: counting,
+    coordinate lists, neighbour masks and distance transforms.
+
+    Requires numpy; hashes and compares equal to a Grid with the same cells.
+    """
+    def __init__(self, width, height, initialValue=False, array=None):
+        if np is None: raise Exception('ArrayGrid requires numpy')
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.width = width
+        self.height = height
+        if array is None:
+            array = np.full((width, height), initialValue, dtype=bool)
+        self.array = array
+
+    def fromGrid(grid):
+        "Builds an ArrayGrid from a Grid, BitGrid or ArrayGrid (always a copy)"
+        if isinstance(grid, ArrayGrid): return grid.copy()
+        if isinstance(grid, BitGrid):
+            # Unpack the bitset directly; BitGrid cell x*height+y is array[x, y]
+            size = grid.width * grid.height
+            cells = np.unpackbits(np.frombuffer(grid.bits.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8),
+                                  count=size, bitorder='little')
+            return ArrayGrid(grid.width, grid.height, array=cells.astype(bool).reshape(grid.width, grid.height))
+        return ArrayGrid(grid.width, grid.height, array=np.array(grid.data, dtype=bool).reshape(grid.width, grid.height))
+    fromGrid = staticmethod(fromGrid)
+
+    def toGrid(self):
+        g = Grid(self.width, self.height)
+        g.data = self.data
+        return g
+
+    def asArray(self):
+        "The backing (width, height) bool array; writes show up in the grid"
+        return self.array
+
+    def __getitem__(self, i):
+        return self.array[i]
+
+    def __setitem__(self, key, item):
+        self.array[key] = item
+
+    def data(self):
+        "A list-of-lists snapshot, for code written against Grid.data"
+        return self.array.tolist()
+    data = property(data)
+
+    def __str__(self):
+        out = [[str(bool(self.array[x, y]))[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, ArrayGrid):
+            return self.array.shape == other.array.shape and bool((self.array == other.array).all())
+        return self.data == other.data
+
+    def __hash__(self):
+        # Same integer Grid.__hash__ builds: bit x * height + y is cell (x,y)
+        packed = np.packbits(self.array.ravel(), bitorder='little')
+        return hash(int.from_bytes(packed.tobytes(), 'little'))
+
+    def copy(self):
+        return ArrayGrid(self.width, self.height, array=self.array.copy())
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        return ArrayGrid(self.width, self.height, array=self.array)
+
+    def count(self, item =True ):
+        ones = int(np.count_nonzero(self.array))
+        return ones if item else self.width * self.height - ones
+
+    def asList(self, key = True):
+        xs, ys = np.nonzero(self.array if key else ~self.array)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def packBits(self):
+        return self.toGrid().packBits()
+
+    def shifted(self, dx, dy):
+        """
+        Returns a bool array whose (x,y) cell holds this grid's (x+dx, y+dy)
+        cell, with False wherever that lies off the board.
+        """
+        out = np.zeros_like(self.array)
+        width, height = self.width, self.height
+        out[max(0, -dx):min(width, width - dx), max(0, -dy):min(height, height - dy)] = \
+            self.array[max(0, dx):min(width, width + dx), max(0, dy):min(height, height + dy)]
+        return out
+
+    def neighborMask(self, walls=None):
+        """
+        Returns a bool array marking every cell one step (N, S, E or W) from
+        a True cell of this grid, excluding wall cells if walls is given.
+        """
+        mask = self.shifted(1, 0) | self.shifted(-1, 0) | self.shifted(0, 1) | self.shifted(0, -1)
+        if walls is not None:
+            mask &= ~_wallArray(walls)
+        return mask
+
+    def manhattanDistances(self, pos):
+        "Returns an int array of Manhattan distances from pos to each True cell"
+        xs, ys = np.nonzero(self.array)
+        return np.abs(xs - int(pos[0])) + np.abs(ys - int(pos[1]))
+
+    def mazeDistances(self, walls):
+        """
+        Distance transform: returns an int array holding, for every cell, the
+        number of moves through non-wall cells to the nearest True cell of
+        this grid, or -1 where no True cell is reachable.  One breadth-first
+        layer is expanded per step, over the whole board at once.
+        """
+        passable = ~_wallArray(walls)
+        distances = np.full(self.array.shape, -1, dtype=np.int32)
+        frontier = self.array & passable
+        distances[frontier] = 0
+        depth = 0
+        while frontier.any():
+            depth += 1
+            frontier = ArrayGrid(self.width, self.height, array=frontier).neighborMask() & passable & (distances < 0)
+            distances[frontier] = depth
+        return distances
+
+def _wallArray(walls):
+    if isinstance(walls, ArrayGrid): return walls.array
+    return ArrayGrid.fromGrid(walls).array
+
+def gridToArray(grid):
+    """
+    Returns grid as a (width, height) bool NumPy array.  This is the backing
+    array itself for an ArrayGrid and a fresh array for any other Grid.
+    """
+    if isinstance(grid, ArrayGrid): return grid.array
+    return ArrayGrid.fromGrid(grid).array
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -368,6 +680,93 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class ActionTable:
+    """
+    The moves open from every cell of a walls Grid, worked out once so the
+    game rules and search problems do not test walls on every call.  The
+    entry for integer cell (x,y) is at index x * height + y, the cell order
+    BitGrid uses:
+
+      actions[i]       the directions Actions.getPossibleActions allows
+      neighbors[i]     the cells Actions.getLegalNeighbors returns
+      successors[i]    ((nextx, nexty), action) for each of NORTH, SOUTH,
+                       EAST and WEST that does not run into a wall
+      predecessors[i]  ((prevx, prevy), action) for each of NORTH, SOUTH,
+                       EAST and WEST that reaches the cell from an open one
+
+    Entries are tuples in the same order the Actions methods and search
+    problems produce them.  Moves off the edge of the grid are never open.
+    The table keeps the walls it was built from in walls.
+    Use Layout.getActionTable, which builds a layout's table once and keeps it.
+    """
+    def __init__( self, walls ):
+        width, height = walls.width, walls.height
+        self.width, self.height = width, height
+        self.walls = walls
+        isOpen = lambda x, y: 0 <= x < width and 0 <= y < height and not walls[x][y]
+        steps = [(dir, vec) for dir, vec in Actions._directionsAsList if dir != Directions.STOP]
+        self.actions, self.neighbors, self.successors, self.predecessors = [], [], [], []
+        for x in range( width ):
+            for y in range( height ):
+                moves = [(dir, (x + dx, y + dy)) for dir, (dx, dy) in Actions._directionsAsList if isOpen(x + dx, y + dy)]
+                self.actions.append( tuple( [dir for dir, cell in moves] ) )
+                self.neighbors.append( tuple( [cell for dir, cell in moves] ) )
+                self.successors.append( tuple( [(cell, dir) for dir, cell in moves if dir != Directions.STOP] ) )
+                self.predecessors.append( tuple( [((x - dx, y - dy), dir) for dir, (dx, dy) in steps if isOpen(x - dx, y - dy)] ) )
+
+    def getPossibleActions( self, config ):
+        "Actions.getPossibleActions( config, walls ) for the walls of this table."
+        x, y = config.pos
+        x_int, y_int = int(x + 0.5), int(y + 0.5)
+        if (abs(x - x_int) + abs(y - y_int)  > Actions.TOLERANCE):
+            return [config.getDirection()]
+        return list( self.actions[x_int * self.height + y_int] )
+
+    def getLegalNeighbors( self, position ):
+        "Actions.getLegalNeighbors( position, walls ) for the walls of this table."
+        x, y = position
+        return list( self.neighbors[int(x + 0.5) * self.height + int(y + 0.5)] )
+
+######################
+# ZOBRIST STATE HASH #
+######################
+
+_ZOBRIST_MASK = (1 << 64) - 1
+# Keys come from a private stream so hashing never disturbs the game's randomness
+_zobristRandom = random.Random(0x9E3779B97F4A7C15)
+_zobristKeys = {}
+
+def zobristKey( *feature ):
+    """
+    Returns the random 64-bit key for a board feature such as ('food', (x, y)).
+    Keys are drawn on first use and fixed for the life of the process.
+    """
+    key = _zobristKeys.get(feature)
+    if key is None:
+        key = _zobristKeys[feature] = _zobristRandom.getrandbits(64)
+    return key
+
+def agentZobristKey( agentIndex, agentState ):
+    conf = agentState.configuration
+    scared = zobristKey('scared', agentIndex, agentState.scaredTimer)
+    if conf == None:
+        return zobristKey('agent', agentIndex, None) ^ scared
+    return zobristKey('agent', agentIndex, conf.pos, conf.direction) ^ scared
+
+def scoreZobristKey( score ):
+    """
+    Scores are unbounded, so rather than a key table they go through the
+    splitmix64 finalizer.  Equal scores (10 and 10.0) give equal keys; whole
+    scores skip hash() because hash(-1) == hash(-2).
+    """
+    if score == int(score):
+        z = int(score) & _ZOBRIST_MASK
+    else:
+        z = hash(score) & _ZOBRIST_MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _ZOBRIST_MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _ZOBRIST_MASK
+    return z ^ (z >> 31)
+
 class GameStateData:
     """
 
@@ -379,11 +778,16 @@ class GameStateData:
         if prevState != None:
             self.food = prevState.food.shallowCopy()
             self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            # AgentStates are shared until written: see getMutableAgentState
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._zobrist = prevState._zobrist
+        else:
+            self._zobrist = None
 
+        self._ownAgentStates = set()
         self._foodEaten = None
         self._foodAdded = None
         self._capsuleEaten = None
@@ -395,7 +799,9 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        state.agentStates = self.copyAgentStates( self.agentStates )
+        state._ownAgentStates = set(range(len(state.agentStates)))
+        # state.layout is shared with self: layouts are immutable once loaded
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -408,6 +814,18 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def getMutableAgentState( self, agentIndex ):
+        """
+        Returns agentStates[agentIndex] for the game rules to modify.  A
+        successor shares its predecessor's AgentStates, so the first call for
+        an index swaps in a private copy; agents that did not change are
+        never copied.
+        """
+        if agentIndex not in self._ownAgentStates:
+            self.agentStates[agentIndex] = self.agentStates[agentIndex].copy()
+            self._ownAgentStates.add(agentIndex)
+        return self.agentStates[agentIndex]
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -422,15 +840,47 @@ class GameStateData:
 
     def __hash__( self ):
         """
-        Allows states to be keys of dictionaries.
+        Allows states to be keys of dictionaries.  The hash is a 64-bit Zobrist
+        key: the XOR of one random key per food dot, capsule and agent
+        (position, direction, scared timer) plus a mix of the score.  Successors
+        update the board part incrementally in updateHash, so hashing a state
+        produced by generateSuccessor is O(1).
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        if self._zobrist is None:
+            self._zobrist = self.boardHash()
+        h = self._zobrist ^ scoreZobristKey(self.score)
+        # Fold into a signed 64-bit value so Python keeps every bit
+        if h >= 1 << 63: h -= 1 << 64
+        return h
+
+    def boardHash( self ):
+        """
+        Computes the Zobrist key of food, capsules and agents from scratch.
+        """
+        h = 0
+        for pos in self.food.asList():
+            h ^= zobristKey('food', pos)
+        for pos in self.capsules:
+            h ^= zobristKey('capsule', pos)
+        for agentIndex, agentState in enumerate( self.agentStates ):
+            h ^= agentZobristKey( agentIndex, agentState )
+        return h
+
+    def updateHash( self, prevState ):
+        """
+        Derives this successor's hash from prevState's, given that the rules
+        changed only the food and capsule recorded in _foodEaten and
+        _capsuleEaten and the agents copied through getMutableAgentState.
+        """
+        if prevState._zobrist is None:
+            prevState._zobrist = prevState.boardHash()
+        h = prevState._zobrist
+        for agentIndex in self._ownAgentStates:
+            h ^= agentZobristKey( agentIndex, prevState.agentStates[agentIndex] )
+            h ^= agentZobristKey( agentIndex, self.agentStates[agentIndex] )
+        if self._foodEaten != None: h ^= zobristKey('food', self._foodEaten)
+        if self._capsuleEaten != None: h ^= zobristKey('capsule', self._capsuleEaten)
+        self._zobrist = h
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -488,7 +938,7 @@ class GameStateData:
         """
         Creates an initial game state from a layout array (see layout.py).
         """
-        self.food = layout.food.copy()
+        self.food = BitGrid.fromGrid(layout.food)
         #self.capsules = []
         self.capsules = layout.capsules[:]
         self.layout = layout
@@ -502,6 +952,8 @@ class GameStateData:
                 if numGhosts == numGhostAgents: continue # Max ghosts reached already
                 else: numGhosts += 1
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
+        self._ownAgentStates = set(range(len(self.agentStates)))
+        self._zobrist = None
         self._eaten = [False for a in self.agentStates]
 
 try:
@@ -515,7 +967,7 @@ class Game:
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, rng=None, measureTimeouts=False ):
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -524,12 +976,20 @@ class Game:
         self.gameOver = False
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
+        # With catchExceptions, time agents rather than interrupt them; the
+        # time limits are still enforced once each call returns
+        self.measureTimeouts = measureTimeouts
         self.moveHistory = []
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
         import io
         self.agentOutput = [io.StringIO() for agent in agents]
+        # The game's own random.Random stream, shared by its agents; without
+        # one they keep drawing from whatever stream they had (see Agent.random)
+        self.random = rng
+        if rng != None:
+            for agent in agents: agent.random = rng
 
     def getProgress(self):
         if self.gameOver:
@@ -587,7 +1047,7 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
+                        timed_func = TimeoutFunction(agent.registerInitialState, self.rules.getMaxStartupTime(i), self.measureTimeouts)
                         try:
                             start_time = time.time()
                             timed_func(self.state.deepCopy())
@@ -621,7 +1081,7 @@ class Game:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
+                        timed_func = TimeoutFunction(agent.observationFunction, self.rules.getMoveTimeout(agentIndex), self.measureTimeouts)
                         try:
                             start_time = time.time()
                             observation = timed_func(self.state.deepCopy())
@@ -644,7 +1104,7 @@ class Game:
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
+                    timed_func = TimeoutFunction(agent.getAction, self.rules.getMoveTimeout(agentIndex) - move_time, self.measureTimeouts)
                     try:
                         start_time = time.time()
                         if skip_action:
@@ -727,3 +1187,98 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+    def runFastForward( self ):
+        """
+        A high-throughput version of run for headless simulation, such as
+        training.  The display is never drawn, agent hooks are looked up once
+        per game, and agents are handed the game's own states rather than deep
+        copies.  With catchExceptions an agent that raises still crashes as in
+        run, and the time limits of run are enforced by timing each call
+        (TimeoutFunction's measureOnly mode): a slow agent is not interrupted,
+        but it loses once its call returns.
+
+        Only use it with trusted agents: states are shared, so an agent that
+        modifies the state it is given corrupts the game.
+        """
+        self.numMoves = 0
+        agents = self.agents
+        for i, agent in enumerate(agents):
+            if not agent:
+                print("Agent %d failed to load" % i, file=sys.stderr)
+                self._agentCrash(i, quiet=True)
+                return
+        timed = self.catchExceptions
+        rules = self.rules
+        observers = [getattr(agent, 'observationFunction', None) for agent in agents]
+        actors = [agent.getAction for agent in agents]
+        if timed:
+            observers = [observe and TimeoutFunction(observe, rules.getMoveTimeout(i), True)
+                         for i, observe in enumerate(observers)]
+            actors = [TimeoutFunction(act, rules.getMoveTimeout(i), True) for i, act in enumerate(actors)]
+        process = rules.process
+        history = self.moveHistory
+
+        numAgents = len( agents )
+        startup = True
+        try:
+            for agentIndex, agent in enumerate(agents):
+                if 'registerInitialState' in dir(agent):
+                    register = agent.registerInitialState
+                    if timed: register = TimeoutFunction(register, rules.getMaxStartupTime(agentIndex), True)
+                    register(self.state.deepCopy())
+                    if timed: self.totalAgentTimes[agentIndex] += register.elapsed
+            startup = False
+            agentIndex = self.startingIndex
+            while not self.gameOver:
+                state = self.state
+                observe = observers[agentIndex]
+                act = actors[agentIndex]
+                if timed:
+                    moveTime = 0.0
+                    if observe != None:
+                        state = observe(state)
+                        moveTime = observe.elapsed
+                    act.timeout = rules.getMoveTimeout(agentIndex) - moveTime
+                    action = act(state)
+                    if self._outOfTime(agentIndex, moveTime + act.elapsed): return
+                else:
+                    if observe != None: state = observe(state)
+                    action = act(state)
+                history.append( (agentIndex, action) )
+                self.state = self.state.generateSuccessor( agentIndex, action )
+                process(self.state, self)
+                agentIndex = ( agentIndex + 1 ) % numAgents
+            for agentIndex, agent in enumerate(agents):
+                if 'final' in dir( agent ): agent.final( self.state )
+        except TimeoutFunctionException:
+            if not timed: raise
+            if startup: print("Agent %d ran out of time on startup!" % agentIndex, file=sys.stderr)
+            else: print("Agent %d timed out on a single move!" % agentIndex, file=sys.stderr)
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+        except Exception:
+            if not self.catchExceptions: raise
+            self._agentCrash(agentIndex)
+
+    def _outOfTime( self, agentIndex, moveTime ):
+        """
+        Charges a move that took moveTime seconds against the warning and
+        total time limits of run.  Returns True, having crashed the agent, if
+        it exceeded them.
+        """
+        if moveTime > self.rules.getMoveWarningTime(agentIndex):
+            self.totalAgentTimeWarnings[agentIndex] += 1
+            print("Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
+            if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
+                print("Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex]), file=sys.stderr)
+                self.agentTimeout = True
+                self._agentCrash(agentIndex, quiet=True)
+                return True
+        self.totalAgentTimes[agentIndex] += moveTime
+        if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
+            print("Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex]), file=sys.stderr)
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+            return True
+        return False
@@ -0,0 +1,148 @@
+"""
+Compact, append-only binary logs of recorded games.
+
+A log starts with MAGIC and is followed by records, each a tag byte, a varint
+payload length and the payload:
+
+  'L'  layout:  8-byte layout hash, then the layout text (utf-8)
+  'G'  game:    8-byte hash of the layout played, then one varint per move
+                encoding agentIndex * 5 + action
+
+A layout record precedes the first game on that layout written by each
+writer; the same layout may appear more than once, e.g. when several worker
+processes append to one log.  Records of unknown tags are skipped, so the
+format can grow.  Games are read back one at a time by readGames, which
+yields the same {'layout', 'actions'} components as the old pickled
+recordings, so they can be handed straight to pacman.replayGame.
+"""
+
+import hashlib
+from game import Directions
+import layout as layoutModule
+
+MAGIC = b'PACLOG1\n'
+LAYOUT_TAG = b'L'
+GAME_TAG = b'G'
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict((action, code) for code, action in enumerate(ACTIONS))
+
+def encodeVarint( value, out ):
+    "Appends the unsigned LEB128 encoding of value to the bytearray out."
+    while value >= 0x80:
+        out.append( (value & 0x7F) | 0x80 )
+        value >>= 7
+    out.append( value )
+
+def decodeVarint( data, pos ):
+    "Returns (value, next position) for the varint starting at data[pos]."
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80: return value, pos
+        shift += 7
+
+def layoutHash( layout ):
+    return hashlib.sha1( str(layout).encode('utf-8') ).digest()[:8]
+
+def isGameLog( path ):
+    f = open( path, 'rb' )
+    try: return f.read( len(MAGIC) ) == MAGIC
+    finally: f.close()
+
+class GameLogWriter:
+    """
+    Appends games to a log, creating it if needed.  Every record goes out in
+    a single unbuffered write to a file opened for appending (continued
+    should the file take only part of it), so processes may share one log.  Create the log (open and close a writer) before
+    sharing it: a writer that finds the file already there appends at once,
+    possibly ahead of the header its creator has yet to write.
+    """
+    def __init__( self, path ):
+        self.path = path
+        try:
+            # Exclusive create, so only the writer creating the log writes MAGIC
+            f = open( path, 'xb' )
+            try: f.write( MAGIC )
+            finally: f.close()
+        except FileExistsError: pass
+        self.file = open( path, 'ab', buffering=0 )
+        self.layouts = set()
+
+    def _writeRecord( self, tag, payload ):
+        record = bytearray( tag )
+        encodeVarint( len(payload), record )
+        record += payload
+        view = memoryview( record )
+        while len(view) > 0:
+            view = view[self.file.write( view ):]
+
+    def write( self, layout, actions ):
+        "Logs a game played on layout; actions is its moveHistory."
+        key = layoutHash( layout )
+        if key not in self.layouts:
+            self._writeRecord( LAYOUT_TAG, key + str(layout).encode('utf-8') )
+            self.layouts.add( key )
+        payload = bytearray( key )
+        for agentIndex, action in actions:
+            encodeVarint( agentIndex * 5 + ACTION_CODES[action], payload )
+        self._writeRecord( GAME_TAG, payload )
+
+    def close( self ):
+        self.file.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
+
+def readRecords( path, bufferSize=1 << 16 ):
+    """
+    Yields the (tag, payload) records of a log, reading it in chunks of
+    bufferSize bytes rather than all at once.
+    """
+    f = open( path, 'rb' )
+    try:
+        if f.read( len(MAGIC) ) != MAGIC: raise Exception( path + ' is not a game log' )
+        data, pos = b'', 0
+        while True:
+            # A header is a tag byte and a varint of at most 10 bytes
+            if len(data) - pos < 11:
+                data = data[pos:] + f.read( bufferSize )
+                pos = 0
+                if len(data) == 0: return
+            tag = data[pos:pos+1]
+            length, start = decodeVarint( data, pos + 1 )
+            while len(data) < start + length:
+                chunk = f.read( max(bufferSize, start + length - len(data)) )
+                if len(chunk) == 0: raise Exception( path + ' ends in a truncated record' )
+                data += chunk
+            yield tag, data[start:start+length]
+            pos = start + length
+    finally:
+        f.close()
+
+def decodeActions( payload, start=8 ):
+    actions = []
+    pos = start
+    while pos < len(payload):
+        code, pos = decodeVarint( payload, pos )
+        actions.append( (code // 5, ACTIONS[code % 5]) )
+    return actions
+
+def readGames( path ):
+    """
+    Yields {'layout': layout, 'actions': moveHistory} for each game in the
+    log at path, in the order they were written.
+    """
+    layouts = {}
+    for tag, payload in readRecords( path ):
+        if tag == LAYOUT_TAG:
+            key = payload[:8]
+            if key not in layouts:
+                layouts[key] = layoutModule.internLayout( payload[8:].decode('utf-8').split('\n') )
+        elif tag == GAME_TAG:
+            yield {'layout': layouts[payload[:8]], 'actions': decodeActions( payload )}
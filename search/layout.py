@@ -13,12 +13,28 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, BitGrid, ActionTable
 import os
 import random
+import stat
+import struct
+import threading
+from collections import OrderedDict
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+LAYOUT_CACHE = OrderedDict() # layout text -> Layout, least recently used first
+LAYOUT_CACHE_LOCK = threading.Lock()
+MAX_CACHED_LAYOUTS = 64
+LAYOUT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Compiled layouts: magic, width, height, numGhosts, capsule count, agent
+# count, then the walls and food bitsets, the capsules, the agent positions
+# and the layout text
+COMPILED_MAGIC = b'PLAY'
+COMPILED_HEADER = struct.Struct('>4sHHHHH')
+COMPILED_POSITION = struct.Struct('>HH')
+COMPILED_AGENT = struct.Struct('>BHH')
 
 class Layout:
     """
@@ -36,11 +52,22 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.actionTable = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getActionTable(self):
+        """
+        Returns the ActionTable (game.py) of the walls, building it on the
+        first call.  Layouts are shared and never modified, so every game and
+        search problem on this layout uses the one table.
+        """
+        if self.actionTable == None:
+            self.actionTable = ActionTable(self.walls)
+        return self.actionTable
+
     def initializeVisibilityMatrix(self):
         global VISIBILITY_MATRIX_CACHE
         if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
@@ -91,7 +118,63 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        # Layouts are never modified after loading, so every copy can share
+        # this one instead of re-parsing layoutText
+        return self
+
+    def __reduce__(self):
+        # Pickles and copies carry the compiled form and come back interned
+        return (Layout.fromBytes, (self.toBytes(),))
+
+    def toBytes(self):
+        """
+        Returns the compiled form of the layout: the walls and food as
+        bitsets in BitGrid cell order, the capsules, the agent positions and
+        the layout text.  Layout.fromBytes rebuilds the layout from it
+        without parsing the text.
+        """
+        size = (self.width * self.height + 7) // 8
+        parts = [COMPILED_HEADER.pack(COMPILED_MAGIC, self.width, self.height, self.numGhosts,
+                                      len(self.capsules), len(self.agentPositions)),
+                 BitGrid.fromGrid(self.walls).bits.to_bytes(size, 'little'),
+                 BitGrid.fromGrid(self.food).bits.to_bytes(size, 'little')]
+        for x, y in self.capsules:
+            parts.append(COMPILED_POSITION.pack(x, y))
+        for isPacman, (x, y) in self.agentPositions:
+            parts.append(COMPILED_AGENT.pack(isPacman, x, y))
+        parts.append('\n'.join(self.layoutText).encode('utf-8'))
+        return b''.join(parts)
+
+    def fromBytes(data):
+        """
+        Returns the shared Layout for a compiled layout from toBytes,
+        decoding it only if its text has not been interned yet.
+        """
+        magic, width, height, numGhosts, numCapsules, numAgents = COMPILED_HEADER.unpack_from(data)
+        if magic != COMPILED_MAGIC: raise Exception('Not a compiled layout')
+        size = (width * height + 7) // 8
+        pos = COMPILED_HEADER.size + 2 * size
+        capsulesEnd = pos + numCapsules * COMPILED_POSITION.size
+        agentsEnd = capsulesEnd + numAgents * COMPILED_AGENT.size
+        text = bytes(data[agentsEnd:]).decode('utf-8')
+        layout = _cachedLayout(text)
+        if layout != None: return layout
+
+        layout = Layout.__new__(Layout)
+        layout.width, layout.height, layout.numGhosts = width, height, numGhosts
+        layout.walls, layout.food = [_bitsetToGrid(data[start:start+size], width, height)
+                                     for start in (COMPILED_HEADER.size, COMPILED_HEADER.size + size)]
+        layout.capsules = [COMPILED_POSITION.unpack_from(data, start)
+                           for start in range(pos, capsulesEnd, COMPILED_POSITION.size)]
+        layout.agentPositions = []
+        for start in range(capsulesEnd, agentsEnd, COMPILED_AGENT.size):
+            isPacman, x, y = COMPILED_AGENT.unpack_from(data, start)
+            layout.agentPositions.append((bool(isPacman), (x, y)))
+        layout.layoutText = text.split('\n')
+        layout.totalFood = layout.food.count()
+        layout.actionTable = None
+        return _cacheLayout(text, layout)
+    fromBytes = staticmethod(fromBytes)
 
     def processLayoutText(self, layoutText):
         """
@@ -129,22 +212,92 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+def _bitsetToGrid(data, width, height):
+    # One character per cell, cell 0 first
+    cells = format(int.from_bytes(data, 'little'), '0%db' % (width * height))[::-1]
+    grid = Grid(width, height)
+    grid.data = [[cell == '1' for cell in cells[x * height:(x + 1) * height]] for x in range(width)]
+    return grid
+
+class LayoutRegistry:
+    """
+    A thread-safe cache of layout files.  A file is read and parsed once and
+    its compiled form (Layout.toBytes) kept, keyed by absolute path, until
+    the file's modification time changes.  Loads return the shared Layout
+    of internLayout, rebuilt from the compiled form without parsing if
+    LAYOUT_CACHE has evicted it since.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {} # absolute path -> (mtime, compiled layout)
+
+    def load(self, path):
+        "Returns the Layout in the file at path, or None if there is no such file."
+        path = os.path.abspath(path)
+        try: info = os.stat(path)
+        except OSError: return None
+        if not stat.S_ISREG(info.st_mode): return None
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry != None and entry[0] == info.st_mtime_ns: return Layout.fromBytes(entry[1])
+        f = open(path)
+        try: layout = internLayout([line.strip() for line in f])
+        finally: f.close()
+        with self.lock:
+            self.entries[path] = (info.st_mtime_ns, layout.toBytes())
+        return layout
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+REGISTRY = LayoutRegistry()
+
 def getLayout(name, back = 2):
-    if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
-        if layout == None: layout = tryToLoad(name)
-    else:
-        layout = tryToLoad('layouts/' + name + '.lay')
-        if layout == None: layout = tryToLoad(name + '.lay')
-    if layout == None and back >= 0:
-        curdir = os.path.abspath('.')
-        os.chdir('..')
-        layout = getLayout(name, back -1)
-        os.chdir(curdir)
-    return layout
+    """
+    Loads layouts/name.lay or name.lay (name may end in .lay already) from
+    the working directory, then from up to back + 1 directories above it,
+    and finally from the directory of this module.  Returns None if none of
+    them has it.  The working directory is never changed, so layouts can be
+    loaded from any thread.
+    """
+    fileName = name if name.endswith('.lay') else name + '.lay'
+    directories = [os.curdir]
+    for i in range(back + 1):
+        directories.append(os.path.join(directories[-1], os.pardir))
+    directories.append(LAYOUT_DIR)
+    for directory in directories:
+        for path in [os.path.join(directory, 'layouts', fileName), os.path.join(directory, fileName)]:
+            layout = REGISTRY.load(path)
+            if layout != None: return layout
+    return None
 
 def tryToLoad(fullname):
-    if(not os.path.exists(fullname)): return None
-    f = open(fullname)
-    try: return Layout([line.strip() for line in f])
-    finally: f.close()
+    return REGISTRY.load(fullname)
+
+def internLayout(layoutText):
+    """
+    Returns the shared Layout for layoutText, parsing it only the first time
+    that text is seen.  Layouts are treated as immutable, so games and game
+    states built from the same text can all hold the same object.  Only the
+    MAX_CACHED_LAYOUTS most recently used texts are kept.
+    """
+    key = '\n'.join(layoutText)
+    layout = _cachedLayout(key)
+    if layout == None: layout = _cacheLayout(key, Layout(layoutText))
+    return layout
+
+def _cachedLayout(text):
+    "The interned Layout for text, or None, marked as recently used"
+    with LAYOUT_CACHE_LOCK:
+        layout = LAYOUT_CACHE.get(text)
+        if layout != None: LAYOUT_CACHE.move_to_end(text)
+        return layout
+
+def _cacheLayout(text, layout):
+    "Interns layout for text unless another thread got there first"
+    with LAYOUT_CACHE_LOCK:
+        layout = LAYOUT_CACHE.setdefault(text, layout)
+        LAYOUT_CACHE.move_to_end(text)
+        while len(LAYOUT_CACHE) > MAX_CACHED_LAYOUTS: LAYOUT_CACHE.popitem(last=False)
+        return layout
@@ -43,15 +43,72 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import Configuration
 from util import nearestPoint
 from util import manhattanDistance
-import util, layout
+import util, layout, gameLog
 import sys, types, time, random, os
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
 
+class ExploredTracker:
+    """
+    Records the states touched by GameState.generateSuccessor.
+
+    Tracking is off unless a tracker is active.  Use it as a context manager:
+
+      with GameState.trackExplored('count') as tracker:
+          ...
+      print(tracker.count)
+
+    mode 'set' keeps every parent and successor, 'first' keeps only the first
+    maxStates distinct ones (the earliest states reached, not a random sample)
+    and 'count' only counts calls, so states are never hashed.
+    """
+
+    def __init__(self, mode='set', maxStates=None):
+        if mode not in ('set', 'first', 'count'):
+            raise ValueError('Unknown exploration tracking mode: %s' % mode)
+        if mode == 'first' and maxStates is None:
+            raise ValueError("Exploration tracking mode 'first' needs maxStates")
+        self.mode = mode
+        self.maxStates = maxStates
+        self.states = set()
+        self.count = 0
+        self.previous = None
+
+    def record(self, parent, successor):
+        self.count += 1
+        if self.mode == 'count':
+            return
+        if self.mode == 'first':
+            # Check before each add, so the set never outgrows maxStates
+            for state in (parent, successor):
+                if len(self.states) < self.maxStates:
+                    self.states.add(state)
+            return
+        self.states.add(parent)
+        self.states.add(successor)
+
+    def reset(self):
+        states = self.states
+        self.states = set()
+        self.count = 0
+        return states
+
+    def __enter__(self):
+        self.previous = GameState.exploredTracker
+        GameState.exploredTracker = self
+        return self
+
+    def __exit__(self, *exc):
+        GameState.exploredTracker = self.previous
+        self.previous = None
+        return False
+
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -71,19 +128,30 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable holding the active ExploredTracker, if any
+    exploredTracker = None
+
+    def trackExplored(mode='set', maxStates=None):
+        """
+        Returns an ExploredTracker; enter it to start recording explored states.
+        """
+        return ExploredTracker(mode, maxStates)
+    trackExplored = staticmethod(trackExplored)
+
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
+        """
+        Returns the states recorded by the active tracker and clears them.
+        Without an active tracker nothing is recorded and the set is empty.
+        """
+        if GameState.exploredTracker is None:
+            return set()
+        return GameState.exploredTracker.reset()
     getAndResetExplored = staticmethod(getAndResetExplored)
 
     def getLegalActions( self, agentIndex=0 ):
         """
         Returns the legal actions for the agent specified.
         """
-#        GameState.explored.add(self)
         if self.isWin() or self.isLose(): return []
 
         if agentIndex == 0:  # Pacman is moving
@@ -112,7 +180,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            GhostRules.decrementTimer( state.data.getMutableAgentState(agentIndex) )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
@@ -120,8 +188,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        state.data.updateHash(self.data)
+        if GameState.exploredTracker is not None:
+            GameState.exploredTracker.record(self, state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -268,14 +337,15 @@ class ClassicGameRules:
     These game rules manage the control flow of a game, deciding when
     and how the game starts and ends.
     """
-    def __init__(self, timeout=30):
+    def __init__(self, timeout=30, measureTimeouts=False):
         self.timeout = timeout
+        self.measureTimeouts = measureTimeouts
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, rng=None):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, rng=rng, measureTimeouts=self.measureTimeouts)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -331,7 +401,7 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions( state.getPacmanState().configuration, state.data.layout.walls )
+        return state.data.layout.getActionTable().getPossibleActions( state.getPacmanState().configuration )
     getLegalActions = staticmethod( getLegalActions )
 
     def applyAction( state, action ):
@@ -342,7 +412,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.getMutableAgentState(0)
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
@@ -361,10 +431,8 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.food = state.data.food.withCell(x, y, False)
             state.data._foodEaten = position
-            # TODO: cache numFood?
             numFood = state.getNumFood()
             if numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
@@ -375,7 +443,7 @@ class PacmanRules:
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.getMutableAgentState(index).scaredTimer = SCARED_TIME
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -389,7 +457,7 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState( ghostIndex ).configuration
-        possibleActions = Actions.getPossibleActions( conf, state.data.layout.walls )
+        possibleActions = state.data.layout.getActionTable().getPossibleActions( conf )
         reverse = Actions.reverseDirection( conf.direction )
         if Directions.STOP in possibleActions:
             possibleActions.remove( Directions.STOP )
@@ -404,7 +472,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.getMutableAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
@@ -414,7 +482,9 @@ class GhostRules:
     def decrementTimer( ghostState):
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint( ghostState.configuration.pos )
+            # Replace rather than edit: Configurations are shared between states
+            conf = ghostState.configuration
+            ghostState.configuration = Configuration( nearestPoint( conf.pos ), conf.direction )
         ghostState.scaredTimer = max( 0, timer - 1 )
     decrementTimer = staticmethod( decrementTimer )
 
@@ -425,12 +495,12 @@ class GhostRules:
                 ghostState = state.data.agentStates[index]
                 ghostPosition = ghostState.configuration.getPosition()
                 if GhostRules.canKill( pacmanPosition, ghostPosition ):
-                    GhostRules.collide( state, ghostState, index )
+                    GhostRules.collide( state, state.data.getMutableAgentState(index), index )
         else:
             ghostState = state.data.agentStates[agentIndex]
             ghostPosition = ghostState.configuration.getPosition()
             if GhostRules.canKill( pacmanPosition, ghostPosition ):
-                GhostRules.collide( state, ghostState, agentIndex )
+                GhostRules.collide( state, state.data.getMutableAgentState(agentIndex), agentIndex )
     checkDeath = staticmethod( checkDeath )
 
     def collide( state, ghostState, agentIndex):
@@ -512,7 +582,7 @@ def readCommand( argv ):
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game log (or pickle) to replay', default=None)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -523,6 +593,14 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--measureTimeouts', action='store_true', dest='measureTimeouts', default=False,
+                      help='With -c, time agent calls instead of interrupting them; limits are checked as each call returns')
+    parser.add_option('--fastForward', action='store_true', dest='fastForward', default=False,
+                      help='Simulate the games without display or state copies; -c times agents without interrupting them (trusted agents only)')
+    parser.add_option('--seed', dest='seed', default=None,
+                      help='Master seed giving every game its own reproducible random stream')
+    parser.add_option('-j', '--workers', dest='workers', type='int',
+                      help=default('Number of processes to play the games in; >1 plays them headless'), default=1)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -570,14 +648,24 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['workers'] = options.workers
+    args['seed'] = options.seed
+    args['fastForward'] = options.fastForward
+    args['measureTimeouts'] = options.measureTimeouts
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
+        if gameLog.isGameLog(options.gameToReplay):
+            for recorded in gameLog.readGames(options.gameToReplay):
+                replayGame(display=args['display'], **recorded)
+            sys.exit(0)
         import pickle
         f = open(options.gameToReplay, 'rb')
         try: recorded = pickle.load(f)
         finally: f.close()
+        # Older pickles hold Layouts without the fields added since; re-intern them
+        recorded['layout'] = layout.internLayout(recorded['layout'].layoutText)
         recorded['display'] = args['display']
         replayGame(**recorded)
         sys.exit(0)
@@ -625,12 +713,20 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, exploredTracker=None, seed=None, fastForward=False, measureTimeouts=False ):
+    # Exploration tracking costs a hash of every successor, so it only runs
+    # when a caller such as the autograder hands in a tracker.
+    if exploredTracker is not None:
+        with exploredTracker:
+            return runGames( layout, pacman, ghosts, display, numGames, record, numTraining, catchExceptions, timeout, seed=seed, fastForward=fastForward, measureTimeouts=measureTimeouts )
+
     import __main__
     __main__.__dict__['_display'] = display
 
-    rules = ClassicGameRules(timeout)
+    rules = ClassicGameRules(timeout, measureTimeouts)
     games = []
+    log = None
+    if record: log = gameLog.GameLogWriter( recordPath( record ) )
 
     for i in range( numGames ):
         beQuiet = i < numTraining
@@ -642,29 +738,121 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
+        rng = None
+        if seed != None: rng = random.Random( gameSeed( seed, i ) )
+        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, rng)
+        if fastForward: game.runFastForward()
+        else: game.run()
         if not beQuiet: games.append(game)
 
-        if record:
-            import time, pickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = open(fname, 'wb')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
+        if log != None: log.write( layout, game.moveHistory )
 
+    if log != None: log.close()
     if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print('Average Score:', sum(scores) / float(len(scores)))
-        print('Scores:       ', ', '.join([str(score) for score in scores]))
-        print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
-        print('Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins]))
+        printSummary( [game.state.getScore() for game in games], [game.state.isWin() for game in games] )
 
     return games
 
+def recordPath( record ):
+    """
+    The game log that games are recorded to: record itself when it is a path,
+    and a new time-stamped log when it is just True.
+    """
+    if record == True:
+        return 'recorded-games-' + '-'.join([str(t) for t in time.localtime()[1:6]])
+    return record
+
+def printSummary( scores, wins ):
+    winRate = wins.count(True)/ float(len(wins))
+    print('Average Score:', sum(scores) / float(len(scores)))
+    print('Scores:       ', ', '.join([str(score) for score in scores]))
+    print('Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate))
+    print('Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins]))
+
+def gameSeed( seed, index ):
+    """
+    The seed of the random stream of game number index in a run whose master
+    seed is seed.
+    """
+    return '%s:%d' % (seed, index)
+
+# The game components of a parallel run and the log its games are recorded
+# to, set in each worker process
+_parallelGame = None
+_parallelLog = None
+
+def _initParallelWorker( components ):
+    global _parallelGame, _parallelLog
+    _parallelGame = components
+    record = components[-1]
+    if record: _parallelLog = gameLog.GameLogWriter( record )
+    import __main__, textDisplay
+    __main__.__dict__['_display'] = textDisplay.NullGraphics()
+
+def _playParallelGame( task ):
+    index, seed = task
+    layout, pacman, ghosts, catchExceptions, timeout, measureTimeouts, fastForward, record = _parallelGame
+    # Code that still draws from the random module is seeded per game too
+    random.seed( gameSeed( seed, index ) )
+    import textDisplay
+    rules = ClassicGameRules(timeout, measureTimeouts)
+    rng = random.Random( gameSeed( seed, index ) )
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions, rng )
+    if fastForward: game.runFastForward()
+    else: game.run()
+    if _parallelLog != None: _parallelLog.write( layout, game.moveHistory )
+    return game.state.getScore(), game.state.isWin()
+
+def runGamesParallel( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=None, seed=None, fastForward=False, measureTimeouts=False ):
+    """
+    Plays the games of runGames headless across a pool of worker processes
+    and prints the same summary.  Training games are played first, in this
+    process, so that every worker starts from the trained agents.  Game i
+    plays with the random stream gameSeed(seed, i), as in runGames, so for
+    agents drawing from self.random the results depend neither on the number
+    of workers nor on running in parallel.  seed defaults to a draw from the
+    random module, so -f still fixes it.
+
+    Returns a (score, isWin) pair per non-training game, in order.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if seed == None: seed = random.getrandbits(64)
+    # Workers append to one log, in the order they finish their games; it is
+    # created here, header and all, before any of them can append to it
+    if record:
+        record = recordPath( record )
+        gameLog.GameLogWriter( record ).close()
+    if numTraining > 0:
+        runGames( layout, pacman, ghosts, display, numTraining, record, numTraining, catchExceptions, timeout, seed=seed, fastForward=fastForward, measureTimeouts=measureTimeouts )
+    workers = workers or os.cpu_count() or 1
+    tasks = [(i, seed) for i in range(numTraining, numGames)]
+    if len(tasks) == 0: return []
+
+    # Forked workers inherit the agents without pickling them (search agents
+    # hold lambdas); other platforms need picklable agents.
+    context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    components = (layout, pacman, ghosts, catchExceptions, timeout, measureTimeouts, fastForward, record)
+    chunkSize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_initParallelWorker, initargs=(components,)) as executor:
+        results = list(executor.map(_playParallelGame, tasks, chunksize=chunkSize))
+
+    printSummary( [score for score, win in results], [win for score, win in results] )
+    return results
+
+def runGamesWithOptions( workers=1, **args ):
+    """
+    Plays games from readCommand's arguments the way the command line does:
+    across workers processes with runGamesParallel, returning its (score,
+    isWin) pairs, when workers > 1, and otherwise with runGames, returning
+    the Games.
+    """
+    if workers > 1: return runGamesParallel( workers=workers, **args )
+    return runGames( **args )
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -677,7 +865,7 @@ if __name__ == '__main__':
     > python pacman.py --help
     """
     args = readCommand( sys.argv[1:] ) # Get game components based on input
-    runGames( **args )
+    runGamesWithOptions( **args )
 
     # import cProfile
     # cProfile.run("runGames( **args )")
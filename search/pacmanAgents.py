@@ -48,7 +48,7 @@ class GreedyAgent(Agent):
         scored = [(self.evaluationFunction(state), action) for state, action in successors]
         bestScore = max(scored)[0]
         bestActions = [pair[1] for pair in scored if pair[0] == bestScore]
-        return random.choice(bestActions)
+        return self.random.choice(bestActions)
 
 def scoreEvaluation(state):
     return state.getScore()
@@ -80,7 +80,7 @@ class SmartAgent(Agent):
         scored = [(self.smartEvaluation(succ), action) for succ, action in successors]
         bestScore = max(scored, key=lambda x: x[0])[0]
         bestActions = [pair[1] for pair in scored if pair[0] == bestScore]
-        return random.choice(bestActions)
+        return self.random.choice(bestActions)
 
     def smartEvaluation(self, state):
         """Return a numeric score for a state. Higher is better."""
@@ -89,18 +89,21 @@ class SmartAgent(Agent):
 
         # Food info
         food = state.getFood()
-        foodList = food.asList()
-        if len(foodList) == 0:
+        pacPos = state.getPacmanPosition()
+        if game.np is not None:
+            # Distances to every pellet in one vectorized pass over the board
+            dists = game.ArrayGrid.fromGrid(food).manhattanDistances(pacPos)
+        else:
+            dists = [util.manhattanDistance(pacPos, f) for f in food.asList()]
+        if len(dists) == 0:
             return float('inf')  # winning state
 
         # Distance to closest food (manhattan)
-        pacPos = state.getPacmanPosition()
-        dists = [util.manhattanDistance(pacPos, f) for f in foodList]
-        minFoodDist = min(dists) if dists else 0
+        minFoodDist = min(dists)
         # prefer closer food (scaled)
         score -= self.foodWeight * minFoodDist
         # prefer fewer remaining pellets (scaled)
-        score -= self.remainWeight * len(foodList)
+        score -= self.remainWeight * len(dists)
 
         # Ghosts: penalize being near non-scared ghosts
         ghostStates = state.getGhostStates()
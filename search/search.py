@@ -18,11 +18,19 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import functools
+import heapq
+import json
+import time
+import tracemalloc
+from collections import OrderedDict
 from game import Directions
+from game import Actions
 from typing import List
 from util import Stack
 from util import Queue
 from util import PriorityQueue
+from util import AdaptivePriorityQueue
 
 
 class SearchProblem:
@@ -78,78 +86,276 @@ def tinyMazeSearch(problem: SearchProblem) -> List[Directions]:
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
+class SearchNodeTable:
+    """
+    A flat store of search nodes shared by the search algorithms below.
+
+    Each node is recorded once as (parent index, action, path cost) in three
+    parallel lists, so the frontier only has to carry an integer node index
+    rather than a copy of the full action list.  The plan is rebuilt by
+    following parent pointers back to the root once a goal is reached.
+    """
+    ROOT = -1
+
+    def __init__(self):
+        self.parents = []
+        self.actions = []
+        self.costs = []
+
+    def add(self, parent, action, cost=0):
+        "Records a node reached from 'parent' via 'action' and returns its index"
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.costs.append(cost)
+        return len(self.parents) - 1
+
+    def addRoot(self):
+        "Records the start node (no parent, no action, zero cost)"
+        return self.add(SearchNodeTable.ROOT, None, 0)
+
+    def getCost(self, node):
+        return self.costs[node]
+
+    def getPath(self, node):
+        "Returns the list of actions leading from the root to 'node'"
+        parents, actions = self.parents, self.actions
+        path = []
+        while parents[node] != SearchNodeTable.ROOT:
+            path.append(actions[node])
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def __len__(self):
+        return len(self.parents)
+
+class SearchStats:
+    """
+    Instrumentation for one run of a search function.  Every algorithm in
+    this file creates one with SearchStats.begin, which also attaches it to
+    the problem as problem.searchStats, and fills in:
+
+      expanded        states whose successors were generated
+      generated       successors returned by those expansions
+      duplicates      generated successors that were not pushed (already
+                      visited, or no cheaper than the known path)
+      frontierPeak    largest frontier size seen after an expansion
+      visitedPeak     largest visited/closed set seen after an expansion
+      heuristicCalls, heuristicTime   calls to the heuristic and their time,
+                      if timeHeuristics is set
+      wallTime        seconds from begin to finish
+      memoryPeak      tracemalloc peak in bytes, if traceMemory is set
+      pathLength      number of actions returned
+
+    Memory tracing slows searches down several times, so it is off unless
+    SearchStats.traceMemory is set to True.  Likewise timing the heuristic
+    reads the clock twice per evaluation, so it is off unless
+    SearchStats.timeHeuristics is set to True.
+
+    record is also the hook for per-expansion work that belongs to the
+    problem rather than the algorithm, looked up on the problem once in
+    begin: problem.chargeExpansion() is called after every expansion (a
+    benchmark's budget raises from it), and problem.markExpanded(state) is
+    called for searches that expand without getSuccessors (jps), so that
+    the problem's expansion bookkeeping still happens.
+    """
+    traceMemory = False
+    timeHeuristics = False
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.frontierPeak = 0
+        self.visitedPeak = 0
+        self.heuristicCalls = 0
+        self.heuristicTime = 0.0
+        self.wallTime = 0.0
+        self.memoryPeak = None
+        self.pathLength = None
+        self._startTime = None
+        self._ownsTrace = False
+        self._chargeExpansion = None
+        self._markExpanded = None
+
+    def begin(algorithm, problem):
+        "Creates the stats for a search that is starting on problem"
+        stats = SearchStats(algorithm)
+        problem.searchStats = stats
+        stats._chargeExpansion = getattr(problem, 'chargeExpansion', None)
+        stats._markExpanded = getattr(problem, 'markExpanded', None)
+        if SearchStats.traceMemory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                stats._ownsTrace = True
+        stats._startTime = time.perf_counter()
+        return stats
+    begin = staticmethod(begin)
+
+    def timeHeuristic(self, heuristic):
+        "Returns heuristic wrapped to count its calls and time, if timeHeuristics is set"
+        if not SearchStats.timeHeuristics: return heuristic
+        def timedHeuristic(state, problem=None):
+            start = time.perf_counter()
+            value = heuristic(state, problem)
+            self.heuristicTime += time.perf_counter() - start
+            self.heuristicCalls += 1
+            return value
+        return timedHeuristic
+
+    def record(self, numSuccessors, frontierSize, visitedSize, state=None):
+        """
+        Records one expansion and the sizes of the structures after it.
+        Searches that expand state without calling getSuccessors pass it in.
+        """
+        if state is not None and self._markExpanded is not None: self._markExpanded(state)
+        if self._chargeExpansion is not None: self._chargeExpansion()
+        self.expanded += 1
+        self.generated += numSuccessors
+        if frontierSize > self.frontierPeak: self.frontierPeak = frontierSize
+        if visitedSize > self.visitedPeak: self.visitedPeak = visitedSize
+
+    def finish(self, path, pushed=None):
+        """
+        Stops the clock and returns path.  pushed is the number of successors
+        that entered the frontier; the rest of those generated were duplicates.
+        """
+        self.wallTime = time.perf_counter() - self._startTime
+        if pushed is not None:
+            self.duplicates = self.generated - pushed
+        if SearchStats.traceMemory and tracemalloc.is_tracing():
+            self.memoryPeak = tracemalloc.get_traced_memory()[1]
+        self.stopTracing()
+        self.pathLength = len(path)
+        return path
+
+    def stopTracing(self):
+        "Stops the memory tracing begin started for this search, if still on"
+        if self._ownsTrace:
+            self._ownsTrace = False
+            if tracemalloc.is_tracing(): tracemalloc.stop()
+
+    def toDict(self):
+        return dict((key, value) for key, value in self.__dict__.items() if not key.startswith('_'))
+
+    def toJson(self, indent=None):
+        return json.dumps(self.toDict(), indent=indent, sort_keys=True)
+
+    def __str__(self):
+        return ('%s: expanded %d, generated %d, duplicates %d, frontier peak %d, visited peak %d, %.3fs'
+                % (self.algorithm, self.expanded, self.generated, self.duplicates,
+                   self.frontierPeak, self.visitedPeak, self.wallTime))
+
+def instrumented(search):
+    """
+    Marks a search function that uses SearchStats: memory tracing started by
+    SearchStats.begin is stopped when the search ends, even if it raises (a
+    timeout, a budget, an interrupt) before reaching SearchStats.finish.
+    """
+    @functools.wraps(search)
+    def run(problem, *args, **kwargs):
+        try:
+            return search(problem, *args, **kwargs)
+        finally:
+            stats = getattr(problem, 'searchStats', None)
+            if stats is not None: stats.stopTracing()
+    return run
+
+@instrumented
 def depthFirstSearch(problem: SearchProblem) -> List[Directions]:
     """
     Search the deepest nodes in the search tree first (DFS).
     Returns a list of actions that reaches the goal.
     """
 
+    stats = SearchStats.begin('depthFirstSearch', problem)
+    nodes = SearchNodeTable()
     stack = Stack()
     start_state = problem.getStartState()
-    stack.push((start_state, []))
+    stack.push((start_state, nodes.addRoot()))
     visited = set()
 
     while not stack.isEmpty():
-        state, actions = stack.pop()
+        state, node = stack.pop()
         if state in visited:
             continue
         visited.add(state)
 
         if problem.isGoalState(state):
-            return actions
+            return stats.finish(nodes.getPath(node), len(nodes) - 1)
 
-        for successor, action, _ in problem.getSuccessors(state):
+        successors = problem.getSuccessors(state)
+        for successor, action, _ in successors:
             if successor not in visited:
-                stack.push((successor, actions + [action]))
+                stack.push((successor, nodes.add(node, action)))
+        stats.record(len(successors), len(stack), len(visited))
 
-    return []
+    return stats.finish([], len(nodes) - 1)
 
+@instrumented
 def breadthFirstSearch(problem: SearchProblem) -> List[Directions]:
     """Search the shallowest nodes in the search tree first (BFS)."""
 
+    stats = SearchStats.begin('breadthFirstSearch', problem)
+    nodes = SearchNodeTable()
     queue = Queue()
     start_state = problem.getStartState()
-    queue.push((start_state, []))
+    queue.push((start_state, nodes.addRoot()))
     visited = set()
 
     while not queue.isEmpty():
-        state, actions = queue.pop()
+        state, node = queue.pop()
         if state in visited:
             continue
         visited.add(state)
 
         if problem.isGoalState(state):
-            return actions
+            return stats.finish(nodes.getPath(node), len(nodes) - 1)
 
-        for successor, action, _ in problem.getSuccessors(state):
+        successors = problem.getSuccessors(state)
+        for successor, action, _ in successors:
             if successor not in visited:
-                queue.push((successor, actions + [action]))
+                queue.push((successor, nodes.add(node, action)))
+        stats.record(len(successors), len(queue), len(visited))
 
-    return []
+    return stats.finish([], len(nodes) - 1)
 
+@instrumented
 def uniformCostSearch(problem: SearchProblem) -> List[Directions]:
     """Search the node of least total cost first."""
 
-    pq = PriorityQueue()
+    stats = SearchStats.begin('uniformCostSearch', problem)
+    nodes = SearchNodeTable()
+    pq = AdaptivePriorityQueue()
+    frontier = dict()
     start_state = problem.getStartState()
-    pq.push((start_state, [], 0), 0)
+    pq.push(start_state, 0)
+    frontier[start_state] = nodes.addRoot()
     visited = dict()
 
     while not pq.isEmpty():
-        state, actions, cost = pq.pop()
+        state = pq.pop()
+        node = frontier.pop(state)
+        cost = nodes.getCost(node)
         if state in visited and visited[state] <= cost:
             continue
         visited[state] = cost
 
         if problem.isGoalState(state):
-            return actions
+            return stats.finish(nodes.getPath(node), len(nodes) - 1)
 
-        for successor, action, stepCost in problem.getSuccessors(state):
+        successors = problem.getSuccessors(state)
+        for successor, action, stepCost in successors:
             new_cost = cost + stepCost
             if successor not in visited or visited[successor] > new_cost:
-                pq.push((successor, actions + [action], new_cost), new_cost)
+                if pq.update(successor, new_cost):
+                    frontier[successor] = nodes.add(node, action, new_cost)
+        stats.record(len(successors), len(pq), len(visited))
 
-    return []
+    return stats.finish([], len(nodes) - 1)
 
 def nullHeuristic(state, problem=None) -> float:
     """
@@ -158,33 +364,568 @@ def nullHeuristic(state, problem=None) -> float:
     """
     return 0
 
+class HeuristicCache:
+    """
+    Wraps a heuristic(state, problem) with a least-recently-used cache of at
+    most maxSize values, so states generated again (A* evaluates every
+    successor, including ones it has already seen) are not re-evaluated.
+
+    Values are keyed by the problem (by identity) and the state (by its hash
+    and equality), so one cache can serve several problems at once, such as
+    the forward and backward problems of biastar; a finished problem's values
+    simply age out.  States must be hashable, as every search here already
+    requires.  hits, misses and getHitRate() report how well the cache is
+    doing.
+    """
+    def __init__(self, heuristic, maxSize=100000):
+        if maxSize < 1: raise ValueError('HeuristicCache needs room for at least one value')
+        self.heuristic = heuristic
+        self.maxSize = maxSize
+        self.values = OrderedDict() # (problem, state) -> value
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__name__ = getattr(heuristic, '__name__', 'heuristic')
+
+    def __call__(self, state, problem=None):
+        values = self.values
+        key = (problem, state)
+        if key in values:
+            self.hits += 1
+            values.move_to_end(key)
+            return values[key]
+        self.misses += 1
+        value = self.heuristic(state, problem)
+        values[key] = value
+        if len(values) > self.maxSize:
+            values.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def getHitRate(self):
+        calls = self.hits + self.misses
+        if calls == 0: return 0.0
+        return self.hits / float(calls)
+
+    def __str__(self):
+        return ('%s cache: %d hits, %d misses (%.1f%% hit rate), %d evictions, %d/%d entries'
+                % (self.__name__, self.hits, self.misses, 100 * self.getHitRate(),
+                   self.evictions, len(self.values), self.maxSize))
+
+def cachedHeuristic(maxSize=100000):
+    """
+    Decorator form of HeuristicCache:
+
+      @cachedHeuristic(maxSize=50000)
+      def myHeuristic(state, problem): ...
+    """
+    return lambda heuristic: HeuristicCache(heuristic, maxSize)
+
+@instrumented
 def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directions]:
     """Search the node that has the lowest combined cost and heuristic first."""
 
-    pq = PriorityQueue()
+    stats = SearchStats.begin('aStarSearch', problem)
+    heuristic = stats.timeHeuristic(heuristic)
+    nodes = SearchNodeTable()
+    pq = AdaptivePriorityQueue()
+    frontier = dict()
     start_state = problem.getStartState()
-    pq.push((start_state, [], 0), heuristic(start_state, problem))
+    pq.push(start_state, heuristic(start_state, problem))
+    frontier[start_state] = nodes.addRoot()
     visited = dict()
 
     while not pq.isEmpty():
-        state, actions, cost = pq.pop()
+        state = pq.pop()
+        node = frontier.pop(state)
+        cost = nodes.getCost(node)
         if state in visited and visited[state] <= cost:
             continue
         visited[state] = cost
 
         if problem.isGoalState(state):
-            return actions
+            return stats.finish(nodes.getPath(node), len(nodes) - 1)
 
-        for successor, action, stepCost in problem.getSuccessors(state):
+        successors = problem.getSuccessors(state)
+        for successor, action, stepCost in successors:
             new_cost = cost + stepCost
             priority = new_cost + heuristic(successor, problem)
             if successor not in visited or visited[successor] > new_cost:
-                pq.push((successor, actions + [action], new_cost), priority)
+                if pq.update(successor, priority):
+                    frontier[successor] = nodes.add(node, action, new_cost)
+        stats.record(len(successors), len(pq), len(visited))
+
+    return stats.finish([], len(nodes) - 1)
+
+@instrumented
+def iterativeDeepeningAStarSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directions]:
+    """
+    IDA*: repeated depth-first searches that cut off any node whose f = g + h
+    exceeds a bound, raising the bound to the smallest f that was cut off
+    until a goal is found.  Only the current path and its pending successor
+    lists are kept, so memory grows with the solution depth instead of the
+    number of states visited; the price is re-expanding states on every
+    iteration and along every path that reaches them.  States already on the
+    current path are skipped, so the search cannot cycle.
+    """
+    stats = SearchStats.begin('iterativeDeepeningAStarSearch', problem)
+    heuristic = stats.timeHeuristic(heuristic)
+    pushed = 0
+    start_state = problem.getStartState()
+    bound = heuristic(start_state, problem)
+
+    while True:
+        nextBound = None
+        actions = []
+        onPath = set([start_state])
+        # Each frame is [state, path cost, iterator over unexplored successors]
+        stack = [[start_state, 0, None]]
+        while stack:
+            frame = stack[-1]
+            state, cost, successors = frame
+            if successors is None:
+                f = cost + heuristic(state, problem)
+                if f > bound:
+                    if nextBound is None or f < nextBound:
+                        nextBound = f
+                    successors = iter(())
+                elif problem.isGoalState(state):
+                    return stats.finish(actions, pushed)
+                else:
+                    successorList = problem.getSuccessors(state)
+                    successors = iter(successorList)
+                    stats.record(len(successorList), len(stack), len(onPath))
+                frame[2] = successors
+            for successor, action, stepCost in successors:
+                if successor not in onPath:
+                    pushed += 1
+                    onPath.add(successor)
+                    actions.append(action)
+                    stack.append([successor, cost + stepCost, None])
+                    break
+            else:
+                stack.pop()
+                onPath.remove(state)
+                if actions:
+                    actions.pop()
+        if nextBound is None:
+            return stats.finish([], pushed)
+        bound = nextBound
+
+class MemoryBoundedNode:
+    """
+    A search node of memoryBoundedAStarSearch.  Parents outlive their
+    children, so the parent pointers of every node in memory lead back to
+    the root.
+    """
+    def __init__(self, state, parent, action, cost, f, depth):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+        self.f = f
+        self.depth = depth
+        self.expanded = False
+        self.children = []      # children currently in memory
+        self.forgotten = {}     # backed-up f of each child dropped from memory
+        self.frontierId = None  # id of this node's live frontier entry, if any
+
+    def getPath(self):
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+@instrumented
+def memoryBoundedAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, maxNodes=10000) -> List[Directions]:
+    """
+    SMA*: A* that keeps at most maxNodes search nodes in memory.
+
+    Nodes are expanded in order of f like aStarSearch (the deepest first on
+    ties), and an expanded node's f is backed up to the lowest f of its
+    children, in memory or forgotten, and on up through its ancestors.
+    Whenever the budget is exceeded the shallowest of the leaves with the
+    highest f is dropped and its parent remembers its f, going back on the
+    frontier with the lowest f it has forgotten so the dropped subtree is
+    regenerated, with that f, only once it is the most promising one again.  A node
+    whose path alone would fill the budget gets f = inf, and so does a node
+    once all of its children have; the search returns [] when the root does.
+    Finds an optimal path whenever it fits within the budget (for an
+    admissible heuristic), re-expanding forgotten nodes as needed.
+    """
+    stats = SearchStats.begin('memoryBoundedAStarSearch', problem)
+    heuristic = stats.timeHeuristic(heuristic)
+    maxNodes = max(int(maxNodes), 2)
+    inf = float('inf')
+    # The frontier holds the unexpanded leaves, by f, and the expanded nodes
+    # waiting to regenerate forgotten children, by the lowest forgotten f;
+    # worstLeaves holds the childless ones, which are the only nodes that may
+    # be dropped.  An entry is live only while its id matches its node's
+    # frontierId, so popping a node from either heap retires its entry in
+    # the other one as well.
+    frontier = []    # (key, -depth, id, node): the node to expand first
+    worstLeaves = [] # (-f, depth, id, node): the leaf to drop first
+    inMemory = dict()
+    counts = {'entries': 0, 'leaves': 0, 'nodes': 1, 'pushed': 0}
+
+    def push(node):
+        if node.frontierId is None:
+            counts['leaves'] += 1
+        counts['entries'] += 1
+        node.frontierId = counts['entries']
+        key = min(node.forgotten.values()) if node.expanded else node.f
+        heapq.heappush(frontier, (key, -node.depth, node.frontierId, node))
+        if not node.children:
+            heapq.heappush(worstLeaves, (-node.f, node.depth, node.frontierId, node))
+        if len(frontier) > 2 * counts['leaves'] + 64:
+            # Mostly retired entries: rebuild both heaps from the live ones
+            frontier[:] = [entry for entry in frontier if entry[3].frontierId == entry[2]]
+            worstLeaves[:] = [entry for entry in worstLeaves if entry[3].frontierId == entry[2]]
+            heapq.heapify(frontier)
+            heapq.heapify(worstLeaves)
+
+    def popLive(heap):
+        while heap:
+            entry = heapq.heappop(heap)
+            node = entry[3]
+            if node.frontierId == entry[2]:
+                node.frontierId = None
+                counts['leaves'] -= 1
+                return entry[0], node
+        return None, None
+
+    def backup(node):
+        # An expanded node's f is the lowest f of its children, including the
+        # forgotten ones, and inf if it has none; changes propagate upwards
+        while node is not None:
+            f = min(node.forgotten.values()) if node.forgotten else inf
+            for child in node.children:
+                f = min(f, child.f)
+            if f == node.f:
+                return
+            node.f = f
+            if node.frontierId is not None:
+                push(node) # refresh its entries
+            node = node.parent
+
+    def forget(node):
+        # Removes a childless node from memory.  Its parent remembers its f
+        # and goes back on the frontier to regenerate it when expanded (a
+        # child forgotten with f = inf never is), and becomes a droppable
+        # leaf itself once it has no children left.
+        if inMemory.get(node.state) is node:
+            del inMemory[node.state]
+        if node.frontierId is not None:
+            node.frontierId = None
+            counts['leaves'] -= 1
+        counts['nodes'] -= 1
+        parent = node.parent
+        parent.children.remove(node)
+        parent.forgotten[node.state] = node.f
+        if node.f < inf or not parent.children:
+            push(parent)
+        backup(parent)
+
+    start_state = problem.getStartState()
+    root = MemoryBoundedNode(start_state, None, None, 0, heuristic(start_state, problem), 0)
+    inMemory[start_state] = root
+    push(root)
+
+    while True:
+        key, node = popLive(frontier)
+        if node is None or key == inf:
+            return stats.finish([], counts['pushed'])
+        if problem.isGoalState(node.state):
+            return stats.finish(node.getPath(), counts['pushed'])
+
+        # Generate the successors not already in memory, which on a node's
+        # first expansion is all of them that no cheaper path reaches;
+        # forgotten children come back with the f they had backed up
+        forgotten = node.forgotten
+        node.expanded = True
+        node.forgotten = dict([(state, f) for state, f in forgotten.items() if f == inf])
+        present = set([child.state for child in node.children])
+        successors = problem.getSuccessors(node.state)
+        for successor, action, stepCost in successors:
+            if successor in present or successor in node.forgotten:
+                continue
+            new_cost = node.cost + stepCost
+            known = inMemory.get(successor)
+            if known is not None and known.cost <= new_cost:
+                continue
+            depth = node.depth + 1
+            f = max(node.f, new_cost + heuristic(successor, problem), forgotten.get(successor, 0))
+            if depth >= maxNodes - 1 and not problem.isGoalState(successor):
+                f = inf # its path alone would fill the budget
+            child = MemoryBoundedNode(successor, node, action, new_cost, f, depth)
+            inMemory[successor] = child
+            counts['nodes'] += 1
+            counts['pushed'] += 1
+            node.children.append(child)
+            push(child)
+        stats.record(len(successors), counts['leaves'], counts['nodes'])
+        backup(node)
+        if not node.children and node is not root:
+            forget(node)
+
+        while counts['nodes'] > maxNodes:
+            _, leaf = popLive(worstLeaves)
+            if leaf is None or leaf is root:
+                break
+            forget(leaf)
+
+class ReverseSearchProblem(SearchProblem):
+    """
+    Runs a point-to-point problem backwards, from its goal to its start.
+
+    The wrapped problem must expose getGoalState() and getPredecessors(state).
+    getPredecessors returns (predecessor, action, stepCost) triples where
+    action leads from predecessor to state, so actions found by a search on
+    the reversed problem are already forward moves.  The reversed goal is
+    stored as self.goal so heuristics written for the forward problem (e.g.
+    manhattanHeuristic) estimate distance to the start instead; any other
+    attribute is looked up on the wrapped problem.
+    """
+    def __init__(self, problem):
+        self.problem = problem
+        self.goal = problem.getStartState()
+
+    def getStartState(self):
+        return self.problem.getGoalState()
 
-    return []
+    def getGoalState(self):
+        return self.goal
+
+    def isGoalState(self, state):
+        return state == self.goal
+
+    def getSuccessors(self, state):
+        return self.problem.getPredecessors(state)
+
+    def getPredecessors(self, state):
+        return self.problem.getSuccessors(state)
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+def _joinPaths(forwardNodes, forwardNode, backwardNodes, backwardNode):
+    """
+    Joins the forward path to a meeting state with the backward path from
+    it: the backward tree records moves towards the goal, root last.
+    """
+    backward = backwardNodes.getPath(backwardNode)
+    backward.reverse()
+    return forwardNodes.getPath(forwardNode) + backward
+
+@instrumented
+def bidirectionalBreadthFirstSearch(problem: SearchProblem) -> List[Directions]:
+    """
+    Breadth-first search from the start and the goal at once, expanding one
+    whole layer of the smaller frontier per step until the two meet.  Finds
+    a path with the fewest actions while expanding roughly two balls of half
+    the radius.  The problem needs getGoalState and getPredecessors (see
+    ReverseSearchProblem).
+    """
+    stats = SearchStats.begin('bidirectionalBreadthFirstSearch', problem)
+    start_state = problem.getStartState()
+    if problem.isGoalState(start_state):
+        return stats.finish([], 0)
+    sides = []
+    for side in [problem, ReverseSearchProblem(problem)]:
+        nodes = SearchNodeTable()
+        root = side.getStartState()
+        sides.append((side, nodes, {root: nodes.addRoot()}, [root]))
+
+    while sides[0][3] and sides[1][3]:
+        if len(sides[0][3]) <= len(sides[1][3]):
+            this, other = sides
+        else:
+            other, this = sides
+        side, nodes, reached, layer = this
+        otherNodes, otherReached = other[1], other[2]
+        meeting, best = None, None
+        nextLayer = []
+        for state in layer:
+            node = reached[state]
+            depth = nodes.getCost(node) + 1
+            successors = side.getSuccessors(state)
+            for successor, action, _ in successors:
+                if successor in reached:
+                    continue
+                reached[successor] = nodes.add(node, action, depth)
+                nextLayer.append(successor)
+                if successor in otherReached:
+                    total = depth + otherNodes.getCost(otherReached[successor])
+                    if best is None or total < best:
+                        meeting, best = successor, total
+            stats.record(len(successors), len(nextLayer) + len(other[3]), len(reached) + len(otherReached))
+        layer[:] = nextLayer
+        if meeting is not None:
+            forward, backward = sides
+            path = _joinPaths(forward[1], forward[2][meeting], backward[1], backward[2][meeting])
+            return stats.finish(path, len(forward[1]) + len(backward[1]) - 2)
+
+    return stats.finish([], len(sides[0][1]) + len(sides[1][1]) - 2)
+
+@instrumented
+def bidirectionalAStarSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directions]:
+    """
+    Front-to-end bidirectional A*.  A forward A* guided by heuristic towards
+    the goal and a backward A* over ReverseSearchProblem guided by heuristic
+    towards the start run side by side, always advancing the smaller
+    frontier.  Every time a state is reached from both sides the joined path
+    becomes a candidate; the search stops once a popped f-value is no better
+    than the cheapest candidate, which is then optimal for an admissible
+    heuristic.
+    """
+    stats = SearchStats.begin('bidirectionalAStarSearch', problem)
+    heuristic = stats.timeHeuristic(heuristic)
+    start_state = problem.getStartState()
+    if problem.isGoalState(start_state):
+        return stats.finish([], 0)
+    sides = []
+    for side in [problem, ReverseSearchProblem(problem)]:
+        nodes = SearchNodeTable()
+        pq = AdaptivePriorityQueue()
+        root = side.getStartState()
+        pq.push(root, heuristic(root, side))
+        sides.append((side, nodes, pq, {root: nodes.addRoot()}))
+    bestCost, meetingNodes = None, None
+
+    while not sides[0][2].isEmpty() and not sides[1][2].isEmpty():
+        forwardFirst = len(sides[0][2]) <= len(sides[1][2])
+        this, other = sides if forwardFirst else (sides[1], sides[0])
+        side, nodes, pq, best = this
+        otherNodes, otherBest = other[1], other[3]
+        state = pq.pop()
+        node = best[state]
+        cost = nodes.getCost(node)
+        if bestCost is not None and cost + heuristic(state, side) >= bestCost:
+            break
+
+        successors = side.getSuccessors(state)
+        for successor, action, stepCost in successors:
+            new_cost = cost + stepCost
+            if successor in best and nodes.getCost(best[successor]) <= new_cost:
+                continue
+            best[successor] = nodes.add(node, action, new_cost)
+            pq.update(successor, new_cost + heuristic(successor, side))
+            if successor in otherBest:
+                otherNode = otherBest[successor]
+                total = new_cost + otherNodes.getCost(otherNode)
+                if bestCost is None or total < bestCost:
+                    bestCost = total
+                    meetingNodes = (best[successor], otherNode) if forwardFirst else (otherNode, best[successor])
+        stats.record(len(successors), len(pq) + len(other[2]), len(best) + len(otherBest))
+
+    pushed = len(sides[0][1]) + len(sides[1][1]) - 2
+    if meetingNodes is None:
+        return stats.finish([], pushed)
+    return stats.finish(_joinPaths(sides[0][1], meetingNodes[0], sides[1][1], meetingNodes[1]), pushed)
+
+def _jump(walls, x, y, dx, dy, goal):
+    """
+    Moves from (x, y) in steps of (dx, dy) and returns the first jump point:
+    the goal, a cell with a forced neighbor (an open side cell whose
+    counterpart one step back is a wall), or, when moving vertically, a cell
+    from which a horizontal scan finds a jump point.  Returns None on
+    hitting a wall first.
+    """
+    while True:
+        x += dx
+        y += dy
+        if walls[x][y]:
+            return None
+        if (x, y) == goal:
+            return (x, y)
+        if dx != 0:
+            if (not walls[x][y + 1] and walls[x - dx][y + 1]) or (not walls[x][y - 1] and walls[x - dx][y - 1]):
+                return (x, y)
+        else:
+            if (not walls[x + 1][y] and walls[x + 1][y - dy]) or (not walls[x - 1][y] and walls[x - 1][y - dy]):
+                return (x, y)
+            if _jump(walls, x, y, 1, 0, goal) != None or _jump(walls, x, y, -1, 0, goal) != None:
+                return (x, y)
+
+def _jumpDirections(move):
+    """
+    The directions worth scanning from a jump point reached by move: ahead
+    and both sides (never back), or all four from the start.
+    """
+    if move == None:
+        return [(0, 1), (0, -1), (1, 0), (-1, 0)]
+    dx, dy = move[0], move[1]
+    if dx != 0:
+        return [(0, 1), (0, -1), (dx, 0)]
+    return [(1, 0), (-1, 0), (0, dy)]
+
+@instrumented
+def jumpPointSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directions]:
+    """
+    A* over jump points for 4-connected, unit-cost grids.
+
+    Instead of pushing every open neighbor, each expansion scans straight
+    lines (see _jump) and only pushes the cells where the path might have
+    to turn, skipping the runs of symmetric cells that make plain A*
+    slow on open maps.  The edges between jump points are straight, so the
+    returned plan is the usual list of single-step actions.  The problem
+    needs walls, getStartState and getGoalState (as PositionSearchProblem
+    with its default unit cost); each jump point expanded is passed to
+    problem.markExpanded, if it has one, through SearchStats.record.
+    """
+    stats = SearchStats.begin('jumpPointSearch', problem)
+    heuristic = stats.timeHeuristic(heuristic)
+    walls = problem.walls
+    goal = problem.getGoalState()
+
+    nodes = SearchNodeTable()
+    pq = AdaptivePriorityQueue()
+    frontier = dict()
+    start_state = problem.getStartState()
+    pq.push(start_state, heuristic(start_state, problem))
+    frontier[start_state] = nodes.addRoot()
+    visited = dict()
+
+    while not pq.isEmpty():
+        state = pq.pop()
+        node = frontier.pop(state)
+        cost = nodes.getCost(node)
+        if state in visited and visited[state] <= cost:
+            continue
+        visited[state] = cost
+
+        if problem.isGoalState(state):
+            actions = []
+            for dx, dy, steps in nodes.getPath(node):
+                actions.extend([Actions.vectorToDirection((dx, dy))] * steps)
+            return stats.finish(actions, len(nodes) - 1)
+
+        x, y = state
+        jumpPoints = 0
+        for dx, dy in _jumpDirections(nodes.actions[node]):
+            jumpPoint = _jump(walls, x, y, dx, dy, goal)
+            if jumpPoint == None:
+                continue
+            jumpPoints += 1
+            steps = abs(jumpPoint[0] - x) + abs(jumpPoint[1] - y)
+            new_cost = cost + steps
+            if jumpPoint not in visited or visited[jumpPoint] > new_cost:
+                if pq.update(jumpPoint, new_cost + heuristic(jumpPoint, problem)):
+                    frontier[jumpPoint] = nodes.add(node, (dx, dy, steps), new_cost)
+        stats.record(jumpPoints, len(pq), len(visited), state)
+
+    return stats.finish([], len(nodes) - 1)
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = memoryBoundedAStarSearch
+bibfs = bidirectionalBreadthFirstSearch
+biastar = bidirectionalAStarSearch
+jps = jumpPointSearch
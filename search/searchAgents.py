@@ -38,8 +38,15 @@ from typing import List, Tuple, Any
 from game import Directions
 from game import Agent
 from game import Actions
+from game import ActionTable
+from game import BitGrid, ArrayGrid
+from game import np, gridToArray
 import util
 import time
+import os
+import hashlib
+from collections import OrderedDict
+import inspect
 import search
 import pacman
 
@@ -70,21 +77,35 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
+      iterativeDeepeningAStarSearch or idastar
+      memoryBoundedAStarSearch or smastar (node budget: -a fn=smastar,maxNodes=5000)
+      jumpPointSearch or jps (unit-cost PositionSearchProblem only)
+
+    Heuristics can be memoized with an LRU cache of cacheSize values, e.g.
+    -a fn=astar,prob=FoodSearchProblem,heuristic=foodHeuristic,cacheSize=50000
 
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', maxNodes=None, cacheSize=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError(fn + ' is not a search function in search.py.')
         func = getattr(search, fn)
-        if 'heuristic' not in func.__code__.co_varnames:
+        self.heuristicCache = None
+        # Memory-bounded searches also take a node budget
+        searchArgs = {}
+        parameters = inspect.signature(func).parameters
+        if maxNodes != None:
+            if 'maxNodes' not in parameters:
+                raise AttributeError(fn + ' does not take a maxNodes budget.')
+            searchArgs['maxNodes'] = int(maxNodes)
+        if 'heuristic' not in parameters:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: func(x, **searchArgs)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -93,8 +114,11 @@ class SearchAgent(Agent):
             else:
                 raise AttributeError(heuristic + ' is not a function in searchAgents.py or search.py.')
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
+            if cacheSize != None:
+                heur = self.heuristicCache = search.HeuristicCache(heur, int(cacheSize))
+                print('[SearchAgent] caching up to %d heuristic values' % self.heuristicCache.maxSize)
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: func(x, heuristic=heur, **searchArgs)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -120,6 +144,8 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if 'searchStats' in dir(problem): self.searchStats = problem.searchStats
+        if 'heuristicCache' in dir(self) and self.heuristicCache != None: print(self.heuristicCache)
 
     def getAction(self, state):
         """
@@ -137,6 +163,17 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+def wallsActionTable(problem):
+    """
+    The ActionTable of problem.walls.  Problems start out with their layout's
+    shared table; one whose walls have been replaced by others gets a table
+    built for them.
+    """
+    table = problem.actionTable
+    if table.walls is not problem.walls:
+        table = problem.actionTable = ActionTable(problem.walls)
+    return table
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -157,6 +194,7 @@ class PositionSearchProblem(search.SearchProblem):
         goal: A position in the gameState
         """
         self.walls = gameState.getWalls()
+        self.actionTable = gameState.data.layout.getActionTable()
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
@@ -197,14 +235,11 @@ class PositionSearchProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        x,y = state
+        table = wallsActionTable(self)
+        for nextState, action in table.successors[x * table.height + y]:
+            cost = self.costFn(nextState)
+            successors.append( ( nextState, action, cost) )
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -214,6 +249,38 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns (predecessor, action, stepCost) triples for the cells that
+        reach state in one move; action leads from predecessor to state.
+        Used by the bidirectional searches, which count these calls as
+        expansions too.
+        """
+        predecessors = []
+        cost = self.costFn(state)
+        x,y = state
+        table = wallsActionTable(self)
+        for prevState, action in table.predecessors[x * table.height + y]:
+            predecessors.append( ( prevState, action, cost) )
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
+    def markExpanded(self, state):
+        "Bookkeeping for searches that expand state without getSuccessors (jps)"
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -282,6 +349,7 @@ class CornersProblem(search.SearchProblem):
         Stores the walls, pacman's starting position and corners.
         """
         self.walls = startingGameState.getWalls()
+        self.actionTable = startingGameState.data.layout.getActionTable()
         self.startingPosition = startingGameState.getPacmanPosition()
         top, right = self.walls.height-2, self.walls.width-2
         self.corners = ((1,1), (1,top), (right, 1), (right, top))
@@ -319,17 +387,14 @@ class CornersProblem(search.SearchProblem):
 
         successors = []
         currentPosition, visited = state
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = currentPosition
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextPosition = (nextx, nexty)
-                nextVisited = list(visited)
-                if nextPosition in self.corners:
-                    idx = self.corners.index(nextPosition)
-                    nextVisited[idx] = True
-                successors.append(((nextPosition, tuple(nextVisited)), action, 1))
+        x, y = currentPosition
+        table = wallsActionTable(self)
+        for nextPosition, action in table.successors[x * table.height + y]:
+            nextVisited = list(visited)
+            if nextPosition in self.corners:
+                idx = self.corners.index(nextPosition)
+                nextVisited[idx] = True
+            successors.append(((nextPosition, tuple(nextVisited)), action, 1))
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -402,10 +467,23 @@ class FoodSearchProblem:
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
       foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+
+    By default foodGrid is a BitGrid, which supports the same [x][y], count()
+    and asList() calls but copies and hashes in O(1).  gridType='ArrayGrid'
+    searches over NumPy-backed grids instead, and gridType='Grid' over plain
+    Grids.
     """
-    def __init__(self, startingGameState: pacman.GameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+    def __init__(self, startingGameState: pacman.GameState, gridType='BitGrid'):
+        food = startingGameState.getFood()
+        if gridType == 'BitGrid':
+            food = BitGrid.fromGrid(food)
+        elif gridType == 'ArrayGrid':
+            food = ArrayGrid.fromGrid(food)
+        elif gridType != 'Grid':
+            raise AttributeError(gridType + ' is not a grid type in game.py.')
+        self.start = (startingGameState.getPacmanPosition(), food)
         self.walls = startingGameState.getWalls()
+        self.actionTable = startingGameState.data.layout.getActionTable()
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
@@ -420,14 +498,12 @@ class FoodSearchProblem:
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( (((nextx, nexty), nextFood), direction, 1) )
+        x, y = state[0]
+        table = wallsActionTable(self)
+        for (nextx, nexty), direction in table.successors[x * table.height + y]:
+            nextFood = state[1].copy()
+            nextFood[nextx][nexty] = False
+            successors.append( (((nextx, nexty), nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -459,6 +535,11 @@ def foodHeuristic(state: Tuple[Tuple, List[List]], problem: FoodSearchProblem):
     a list of food coordinates instead.
     """
     position, foodGrid = state
+    if isinstance(foodGrid, ArrayGrid):
+        # ArrayGrid: all distances in one vectorized pass
+        distances = foodGrid.manhattanDistances(position)
+        return int(distances.max()) if len(distances) else 0
+
     foodList = foodGrid.asList()
     if not foodList:
         return 0
@@ -523,6 +604,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.actionTable = gameState.data.layout.getActionTable()
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
@@ -551,5 +633,151 @@ def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pa
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
+    if np is not None:
+        oracle = MazeDistanceOracle.forState(gameState)
+        distance = oracle.getDistance(point1, point2)
+        if distance != oracle.unreachable: return distance
     prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return len(search.bibfs(prob))
+
+class MazeDistanceOracle:
+    """
+    Maze distances for one set of walls.  The first query from a cell runs a
+    breadth-first search from it and keeps its whole row of distances, so
+    later queries from that cell are table lookups and memory grows with the
+    cells queried from rather than with all pairs.  Rows are NumPy arrays
+    ordered like self.cells, uint16 while the maze has fewer than 65535 open
+    cells and uint32 beyond, with self.unreachable for disconnected cells.
+
+    Use forState or forWalls rather than the constructor: the MAX_ORACLES
+    most recently used oracles are memoized by a hash of the wall layout, so
+    games and heuristics on the same maze share one.  computeAll fills in
+    every row at once with a batched BFS; only a forWalls call given a
+    cacheDir does that up front, saving the (cells x cells) matrix there and
+    memory-mapping it back so that later processes skip the searches.
+    """
+    BATCH_SIZE = 256 # BFS sources expanded together; bounds temporary memory
+    MAX_ORACLES = 8
+    _oracles = OrderedDict()
+    _lastOracle = None # skips rehashing when the same walls object is asked for again
+
+    def __init__(self, walls, distances=None):
+        if np is None: raise Exception('MazeDistanceOracle requires numpy')
+        self.walls = walls
+        self.passable = ~gridToArray(walls)
+        self.sources = np.argwhere(self.passable)
+        self.cells = [(int(x), int(y)) for x, y in self.sources]
+        self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.unreachable = int(np.iinfo(MazeDistanceOracle.distanceType(len(self.cells))).max)
+        self.rows = {} # cell index -> row, until computeAll
+        self.distances = distances # the full matrix, once computed or loaded
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the number of moves between two open cells, or
+        self.unreachable if there is no path.
+        """
+        return int(self.getDistancesFrom(pos1)[self.cellIndex[pos2]])
+
+    def getDistancesFrom(self, pos):
+        """
+        Returns the row of distances from pos, ordered like self.cells.
+        """
+        index = self.cellIndex[pos]
+        if self.distances is not None: return self.distances[index]
+        row = self.rows.get(index)
+        if row is None:
+            row = self.rows[index] = MazeDistanceOracle.distancesFrom(self.passable, self.sources[index:index + 1])[0]
+        return row
+
+    def computeAll(self):
+        "Fills in the distances from every cell at once"
+        if self.distances is None:
+            self.distances = MazeDistanceOracle.allPairs(self.passable)
+            self.rows = {}
+
+    def forState(gameState, cacheDir=None):
+        return MazeDistanceOracle.forWalls(gameState.getWalls(), cacheDir)
+    forState = staticmethod(forState)
+
+    def forWalls(walls, cacheDir=None):
+        last = MazeDistanceOracle._lastOracle
+        if last is not None and last.walls is walls and (cacheDir is None or last.distances is not None): return last
+        key = MazeDistanceOracle.contentHash(walls)
+        oracles = MazeDistanceOracle._oracles
+        oracle = oracles.get(key)
+        if oracle is None:
+            oracle = oracles[key] = MazeDistanceOracle(walls)
+            if len(oracles) > MazeDistanceOracle.MAX_ORACLES: oracles.popitem(last=False)
+        else:
+            oracles.move_to_end(key)
+        if cacheDir is not None and oracle.distances is None:
+            oracle.distances = MazeDistanceOracle._loadOrSave(walls, os.path.join(cacheDir, 'maze-%s.npy' % key))
+            oracle.rows = {}
+        MazeDistanceOracle._lastOracle = oracle
+        return oracle
+    forWalls = staticmethod(forWalls)
+
+    def contentHash(walls):
+        """
+        A stable digest of the wall layout, usable as a file name.
+        """
+        walls = gridToArray(walls)
+        digest = hashlib.sha1(('%d %d ' % walls.shape).encode())
+        digest.update(np.packbits(walls).tobytes())
+        return digest.hexdigest()
+    contentHash = staticmethod(contentHash)
+
+    def distanceType(numCells):
+        "The smallest unsigned dtype whose maximum is never a real distance"
+        return np.uint16 if numCells < np.iinfo(np.uint16).max else np.uint32
+    distanceType = staticmethod(distanceType)
+
+    def distancesFrom(passable, sources):
+        """
+        Runs a layered BFS from each of the (x, y) sources at once over the
+        passable (width, height) mask and returns one row of distances per
+        source, ordered like the open cells of the mask.
+        """
+        dtype = MazeDistanceOracle.distanceType(int(passable.sum()))
+        frontier = np.zeros((len(sources),) + passable.shape, dtype=bool)
+        frontier[np.arange(len(sources)), sources[:, 0], sources[:, 1]] = True
+        reached = frontier.copy()
+        layers = np.full(frontier.shape, np.iinfo(dtype).max, dtype=dtype)
+        layers[frontier] = 0
+        depth = 0
+        while frontier.any():
+            depth += 1
+            grown = np.zeros_like(frontier)
+            grown[:, 1:, :] |= frontier[:, :-1, :]
+            grown[:, :-1, :] |= frontier[:, 1:, :]
+            grown[:, :, 1:] |= frontier[:, :, :-1]
+            grown[:, :, :-1] |= frontier[:, :, 1:]
+            frontier = grown & passable & ~reached
+            reached |= frontier
+            layers[frontier] = depth
+        return layers[:, passable]
+    distancesFrom = staticmethod(distancesFrom)
+
+    def allPairs(passable):
+        """
+        Returns the (cells x cells) distance matrix of the passable mask,
+        running distancesFrom on BATCH_SIZE sources at a time.
+        """
+        sources = np.argwhere(passable)
+        numCells = len(sources)
+        distances = np.empty((numCells, numCells), dtype=MazeDistanceOracle.distanceType(numCells))
+        for start in range(0, numCells, MazeDistanceOracle.BATCH_SIZE):
+            batch = sources[start:start + MazeDistanceOracle.BATCH_SIZE]
+            distances[start:start + len(batch)] = MazeDistanceOracle.distancesFrom(passable, batch)
+        return distances
+    allPairs = staticmethod(allPairs)
+
+    def _loadOrSave(walls, path):
+        if not os.path.exists(path):
+            tmpPath = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmpPath, 'wb') as f:
+                np.save(f, MazeDistanceOracle.allPairs(~gridToArray(walls)))
+            os.replace(tmpPath, path)
+        return np.load(path, mmap_mode='r')
+    _loadOrSave = staticmethod(_loadOrSave)
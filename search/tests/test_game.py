@@ -0,0 +1,301 @@
+import importlib
+import os
+import random
+import sys
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+
+def _random_grid(game, width, height, seed):
+    rng = random.Random(seed)
+    grid = game.Grid(width, height)
+    for x in range(width):
+        for y in range(height):
+            grid[x][y] = rng.random() < 0.4
+    return grid
+
+
+def test_bit_grid_matches_grid():
+    game = importlib.import_module('game')
+    grid = _random_grid(game, 7, 5, 0)
+    bits = game.BitGrid.fromGrid(grid)
+    assert bits == grid and grid == bits
+    assert hash(bits) == hash(grid)
+    assert bits.count() == grid.count() and bits.count(False) == grid.count(False)
+    assert bits.asList() == grid.asList() and bits.asList(False) == grid.asList(False)
+    assert str(bits) == str(grid)
+    assert bits.packBits() == grid.packBits()
+    assert [list(bits[x]) for x in range(7)] == grid.data
+
+
+def test_bit_grid_copies_do_not_share_writes():
+    game = importlib.import_module('game')
+    bits = game.BitGrid(4, 3, True)
+    copy = bits.copy()
+    copy[2][1] = False
+    assert bits[2][1] and not copy[2][1]
+    assert copy.count() == 11 and hash(copy) != hash(bits)
+    assert copy == bits.withCell(2, 1, False)
+
+
+def test_array_grid_matches_grid():
+    import pytest
+    pytest.importorskip('numpy')
+    game = importlib.import_module('game')
+    grid = _random_grid(game, 6, 5, 1)
+    array = game.ArrayGrid.fromGrid(grid)
+    assert array == grid and grid == array and hash(array) == hash(grid)
+    assert array.count() == grid.count() and array.asList() == grid.asList()
+    assert array.asList(False) == grid.asList(False) and str(array) == str(grid)
+    array.asArray()[0, 0] = not grid[0][0]
+    assert array[0][0] != grid[0][0]
+    # BitGrids are unpacked straight from their bits
+    assert game.ArrayGrid.fromGrid(game.BitGrid.fromGrid(grid)) == grid
+
+
+def test_array_grid_distance_transform():
+    import pytest
+    pytest.importorskip('numpy')
+    game = importlib.import_module('game')
+    walls = game.Grid(5, 3)
+    for y in range(3):
+        walls[2][y] = y != 0
+    food = game.ArrayGrid(5, 3)
+    food[4][2] = True
+    distances = food.mazeDistances(walls)
+    assert distances[4, 2] == 0
+    assert distances[0, 2] == 8
+    assert distances[2, 2] == -1
+    assert food.manhattanDistances((0, 0)).tolist() == [6]
+    assert food.neighborMask(walls).sum() == 2
+
+
+def test_successor_does_not_mutate_parent():
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    state = pacman.GameState()
+    state.initialize(layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', 'smallClassic.lay')), 2)
+    before = (state.getPacmanPosition(), state.getGhostPositions(), state.getFood().asList())
+    for action in state.getLegalPacmanActions():
+        successor = state.generateSuccessor(0, action)
+        successor.generateSuccessor(1, successor.getLegalActions(1)[0])
+    assert (state.getPacmanPosition(), state.getGhostPositions(), state.getFood().asList()) == before
+    assert state.data.agentStates[1] is state.generateSuccessor(0, 'Stop').data.agentStates[1]
+
+
+def test_explored_tracking_is_opt_in_and_bounded():
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    state = pacman.GameState()
+    state.initialize(layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', 'smallClassic.lay')), 2)
+
+    def expand():
+        for action in state.getLegalPacmanActions():
+            state.generateSuccessor(0, action)
+
+    expand()
+    assert pacman.GameState.getAndResetExplored() == set()
+    with pacman.GameState.trackExplored('count') as counter:
+        expand()
+    assert counter.count == len(state.getLegalPacmanActions()) and not counter.states
+    for maxStates in [1, 2]:
+        with pacman.GameState.trackExplored('first', maxStates=maxStates):
+            expand()
+            assert len(pacman.GameState.getAndResetExplored()) == maxStates
+    assert pacman.GameState.exploredTracker is None
+
+
+def test_incremental_hash_matches_full_hash():
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    rng = random.Random(3)
+    start = pacman.GameState()
+    start.initialize(layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', 'mediumClassic.lay')), 2)
+    for game in range(5):
+        state = start
+        for move in range(300):
+            if state.isWin() or state.isLose():
+                break
+            agentIndex = move % state.getNumAgents()
+            state = state.generateSuccessor(agentIndex, rng.choice(state.getLegalActions(agentIndex)))
+            assert state.data._zobrist == state.data.boardHash()
+            copy = state.deepCopy()
+            copy.data._zobrist = None
+            assert hash(copy) == hash(state) and copy == state
+    assert hash(start) != hash(start.generateSuccessor(0, 'Stop'))
+    game = importlib.import_module('game')
+    assert game.scoreZobristKey(-1) != game.scoreZobristKey(-2)
+    assert game.scoreZobristKey(10) == game.scoreZobristKey(10.0)
+
+
+def test_seeded_games_do_not_depend_on_workers(capsys, tmp_path):
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    pacmanAgents = importlib.import_module('pacmanAgents')
+    ghostAgents = importlib.import_module('ghostAgents')
+    lay = layout.getLayout('smallClassic')
+    ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(2)]
+    display = importlib.import_module('textDisplay').NullGraphics()
+    one = pacman.runGamesParallel(lay, pacmanAgents.GreedyAgent(), ghosts, display, 6, False, workers=1, seed=7)
+    path = str(tmp_path / 'games')
+    three = pacman.runGamesParallel(lay, pacmanAgents.GreedyAgent(), ghosts, display, 6, path, workers=3, seed=7)
+    assert len(one) == 6 and one == three
+    assert 'Win Rate:' in capsys.readouterr().out
+    # The workers share a log whose header is written once
+    gameLog = importlib.import_module('gameLog')
+    assert len(list(gameLog.readGames(path))) == 6
+    assert open(path, 'rb').read().count(gameLog.MAGIC) == 1
+
+    random.seed(1)
+    games = pacman.runGames(lay, pacmanAgents.GreedyAgent(), ghosts, display, 6, False, seed=7)
+    assert [(game.state.getScore(), game.state.isWin()) for game in games] == one
+    # Games without a stream of their own leave the agents' streams alone
+    agent = pacmanAgents.GreedyAgent()
+    agent.random = own = random.Random(5)
+    game = importlib.import_module('game').Game([agent], display, None)
+    assert game.random == None and agent.random is own
+    # runGamesWithOptions picks between them as the command line does
+    args = pacman.readCommand(['-l', 'smallClassic', '-p', 'GreedyAgent', '-q', '-n', '6', '--seed', '7', '-j', '3'])
+    assert pacman.runGamesWithOptions(**args) == one
+    args['workers'] = 1
+    assert [(game.state.getScore(), game.state.isWin()) for game in pacman.runGamesWithOptions(**args)] == one
+
+
+def test_game_log_round_trip_streams_games(tmp_path, capsys):
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    pacmanAgents = importlib.import_module('pacmanAgents')
+    ghostAgents = importlib.import_module('ghostAgents')
+    gameLog = importlib.import_module('gameLog')
+    textDisplay = importlib.import_module('textDisplay')
+    path = str(tmp_path / 'games')
+    ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(2)]
+    games = pacman.runGames(layout.getLayout('smallClassic'), pacmanAgents.GreedyAgent(), ghosts,
+                            textDisplay.NullGraphics(), 3, path, seed=1)
+    games += pacman.runGames(layout.getLayout('testClassic'), pacmanAgents.GreedyAgent(), ghosts,
+                             textDisplay.NullGraphics(), 2, path, seed=2)
+    assert gameLog.isGameLog(path)
+    assert os.path.getsize(path) < sum(len(game.moveHistory) for game in games) * 2
+
+    recorded = list(gameLog.readGames(path))
+    assert [r['actions'] for r in recorded] == [game.moveHistory for game in games]
+    assert [str(r['layout']) for r in recorded] == [str(game.state.data.layout) for game in games]
+    assert [(tag, len(payload)) for tag, payload in gameLog.readRecords(path, bufferSize=16)] == \
+           [(tag, len(payload)) for tag, payload in gameLog.readRecords(path)]
+
+    # A record the file takes only part of is finished by further writes
+    short = str(tmp_path / 'short')
+    with gameLog.GameLogWriter(short) as writer:
+        raw = writer.file
+
+        class ShortWrites:
+            def write(self, data):
+                return raw.write(bytes(data[:3]))
+
+            def close(self):
+                raw.close()
+        writer.file = ShortWrites()
+        writer.write(games[0].state.data.layout, games[0].moveHistory)
+    assert [r['actions'] for r in gameLog.readGames(short)] == [games[0].moveHistory]
+
+    capsys.readouterr()
+    pacman.replayGame(display=textDisplay.NullGraphics(), **recorded[0])
+    assert 'Score: %d' % games[0].state.getScore() in capsys.readouterr().out
+
+
+def test_fast_forward_plays_the_same_games():
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    pacmanAgents = importlib.import_module('pacmanAgents')
+    ghostAgents = importlib.import_module('ghostAgents')
+    textDisplay = importlib.import_module('textDisplay')
+    lay = layout.getLayout('smallClassic')
+    ghosts = [ghostAgents.DirectionalGhost(i + 1) for i in range(2)]
+    histories = []
+    for fastForward in [False, True]:
+        histories.append([game.moveHistory for game in pacman.runGames(
+            lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), 3, False,
+            catchExceptions=True, seed=6, fastForward=fastForward)])
+    assert histories[0] == histories[1]
+
+
+def test_fast_forward_enforces_time_limits():
+    import time
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    pacmanAgents = importlib.import_module('pacmanAgents')
+    textDisplay = importlib.import_module('textDisplay')
+
+    class SlowAgent(pacmanAgents.GreedyAgent):
+        def getAction(self, state):
+            time.sleep(0.2)
+            return pacmanAgents.GreedyAgent.getAction(self, state)
+
+    games = pacman.runGames(layout.getLayout('tinyMaze'), SlowAgent(), [], textDisplay.NullGraphics(), 1, False,
+                            catchExceptions=True, timeout=0.1, fastForward=True)
+    assert games[0].agentTimeout and games[0].agentCrashed and len(games[0].moveHistory) == 0
+
+
+def test_action_table_matches_wall_checks():
+    game = importlib.import_module('game')
+    layout = importlib.import_module('layout')
+    lay = layout.tryToLoad(os.path.join(SEARCH_DIR, 'layouts', 'mediumClassic.lay'))
+    table = lay.getActionTable()
+    assert lay.getActionTable() is table
+    moves = [game.Directions.NORTH, game.Directions.SOUTH, game.Directions.EAST, game.Directions.WEST]
+    for x in range(1, lay.width - 1):
+        for y in range(1, lay.height - 1):
+            config = game.Configuration((x, y), game.Directions.STOP)
+            assert table.getPossibleActions(config) == game.Actions.getPossibleActions(config, lay.walls)
+            assert table.getLegalNeighbors((x, y)) == game.Actions.getLegalNeighbors((x, y), lay.walls)
+            successors = [(tuple(map(int, game.Actions.getSuccessor((x, y), a))), a) for a in moves]
+            assert list(table.successors[x * lay.height + y]) == [(c, a) for c, a in successors if not lay.walls[c[0]][c[1]]]
+    between = game.Configuration((1.5, 1), game.Directions.EAST)
+    assert table.getPossibleActions(between) == [game.Directions.EAST]
+
+
+def test_layout_registry_caches_by_mtime_without_chdir(tmp_path, monkeypatch):
+    import pickle
+    import threading
+    layout = importlib.import_module('layout')
+    path = tmp_path / 'layouts' / 'box.lay'
+    path.parent.mkdir()
+    path.write_text('%%%%\n%P.%\n%%%%\n')
+    monkeypatch.chdir(tmp_path / 'layouts')
+    first = layout.getLayout('box')
+    assert first is layout.getLayout('box.lay') is layout.tryToLoad(str(path))
+    assert os.getcwd() == str(tmp_path / 'layouts')
+    # Layouts of the search directory are found from anywhere
+    assert layout.getLayout('tinyMaze') is not None and layout.getLayout('noSuchLayout') == None
+
+    path.write_text('%%%%%\n%P.o%\n%%%%%\n')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    second = layout.getLayout('box')
+    assert second is not first and second.capsules == [(3, 1)]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(layout.getLayout('mediumClassic'))) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+    lay = results[0]
+    data = lay.toBytes()
+    del layout.LAYOUT_CACHE[str(lay)]
+    compiled = layout.Layout.fromBytes(data)
+    assert compiled is not lay and layout.Layout.fromBytes(data) is compiled
+    for field in ['width', 'height', 'walls', 'food', 'capsules', 'agentPositions', 'numGhosts', 'totalFood', 'layoutText']:
+        assert getattr(compiled, field) == getattr(lay, field)
+    assert pickle.loads(pickle.dumps(compiled)) is compiled
+
+    # Only the most recently used layouts stay interned...
+    for i in range(layout.MAX_CACHED_LAYOUTS):
+        layout.internLayout(['%' * (i + 3)])
+    assert len(layout.LAYOUT_CACHE) == layout.MAX_CACHED_LAYOUTS and str(compiled) not in layout.LAYOUT_CACHE
+    # ...but the registry keeps compiled forms, so an evicted layout file is
+    # rebuilt from them without being parsed again
+    monkeypatch.setattr(layout.Layout, 'processLayoutText', None)
+    rebuilt = layout.getLayout('mediumClassic')
+    assert rebuilt is not compiled and rebuilt.walls == compiled.walls
@@ -0,0 +1,259 @@
+import importlib
+import os
+import sys
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+
+def _maze_problem(layoutName):
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    searchAgents = importlib.import_module('searchAgents')
+    lay = layout.Layout([line.strip() for line in open(os.path.join(SEARCH_DIR, 'layouts', layoutName + '.lay'))])
+    state = pacman.GameState()
+    state.initialize(lay, 0)
+    return searchAgents.PositionSearchProblem(state, warn=False, visualize=False)
+
+
+def test_search_functions_return_legal_optimal_paths():
+    search = importlib.import_module('search')
+    for fn, optimal in [(search.bfs, True), (search.ucs, True), (search.astar, True), (search.dfs, False)]:
+        problem = _maze_problem('mediumMaze')
+        path = fn(problem)
+        cost = problem.getCostOfActions(path)
+        assert cost < 999999
+        if optimal:
+            assert cost == 68
+
+
+def test_problems_search_their_own_walls():
+    search = importlib.import_module('search')
+    problem = _maze_problem('mediumMaze')
+    layoutTable = problem.actionTable
+    walls = problem.walls.copy()
+    for x in range(1, walls.width - 1):
+        for y in range(1, walls.height - 1):
+            walls[x][y] = False
+    problem.walls = walls
+    (x, y), (goalx, goaly) = problem.getStartState(), problem.goal
+    assert problem.getCostOfActions(search.bfs(problem)) == abs(x - goalx) + abs(y - goaly)
+    assert layoutTable.walls is not walls and problem.actionTable.walls is walls
+
+
+def test_bidirectional_searches_find_optimal_paths():
+    search = importlib.import_module('search')
+    searchAgents = importlib.import_module('searchAgents')
+    problem = _maze_problem('mediumMaze')
+    assert problem.getCostOfActions(search.bibfs(problem)) == 68
+    for costFn in [lambda pos: 1, lambda pos: 1 + (7 * pos[0] + 3 * pos[1]) % 5]:
+        problem = _maze_problem('mediumMaze')
+        problem.costFn = costFn
+        optimal = problem.getCostOfActions(search.ucs(problem))
+        problem = _maze_problem('mediumMaze')
+        problem.costFn = costFn
+        path = search.biastar(problem, heuristic=searchAgents.manhattanHeuristic)
+        assert problem.getCostOfActions(path) == optimal
+
+
+def test_jump_point_search_matches_astar():
+    import random
+    search = importlib.import_module('search')
+    searchAgents = importlib.import_module('searchAgents')
+    rng = random.Random(0)
+    for layoutName in ['openMaze', 'mediumMaze', 'bigSearch']:
+        walls = _maze_problem(layoutName).walls
+        cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        for _ in range(20):
+            start, goal = rng.choice(cells), rng.choice(cells)
+            costs, expanded = [], []
+            for fn in [search.astar, search.jps]:
+                problem = _maze_problem(layoutName)
+                problem.startState, problem.goal = start, goal
+                costs.append(problem.getCostOfActions(fn(problem, heuristic=searchAgents.manhattanHeuristic)))
+                expanded.append(problem._expanded)
+            assert costs[0] == costs[1]
+            assert expanded[1] <= expanded[0]
+
+
+def test_memory_bounded_searches_stay_optimal():
+    search = importlib.import_module('search')
+    searchAgents = importlib.import_module('searchAgents')
+    heuristic = searchAgents.manhattanHeuristic
+    for fn, kwargs in [(search.idastar, {}), (search.smastar, {'maxNodes': 100}), (search.smastar, {'maxNodes': 1000})]:
+        problem = _maze_problem('mediumMaze')
+        assert problem.getCostOfActions(fn(problem, heuristic=heuristic, **kwargs)) == 68
+    # The 68-step path cannot fit in 50 nodes
+    assert search.smastar(_maze_problem('mediumMaze'), heuristic=heuristic, maxNodes=50) == []
+    # Nor can the 28-step corners tour in 20, where states are reached again
+    layout = importlib.import_module('layout')
+    pacman = importlib.import_module('pacman')
+    state = pacman.GameState()
+    state.initialize(layout.getLayout('tinyCorners'), 0)
+    for maxNodes, cost in [(20, None), (40, 28)]:
+        problem = searchAgents.CornersProblem(state)
+        path = search.smastar(problem, heuristic=searchAgents.cornersHeuristic, maxNodes=maxNodes)
+        assert (path == [] if cost == None else problem.getCostOfActions(path) == cost)
+
+
+def test_search_stats_are_attached_and_exportable():
+    import json
+    search = importlib.import_module('search')
+    searchAgents = importlib.import_module('searchAgents')
+    for fn, kwargs in [(search.bfs, {}), (search.astar, {'heuristic': searchAgents.manhattanHeuristic})]:
+        problem = _maze_problem('mediumMaze')
+        path = fn(problem, **kwargs)
+        stats = problem.searchStats
+        assert stats.algorithm == fn.__name__ and stats.pathLength == len(path)
+        assert stats.expanded == problem._expanded
+        assert stats.generated - stats.duplicates <= stats.visitedPeak + stats.frontierPeak
+        assert json.loads(stats.toJson())['expanded'] == stats.expanded
+    # The heuristic is only timed on request
+    assert stats.heuristicCalls == 0
+    search.SearchStats.timeHeuristics = True
+    try:
+        problem = _maze_problem('mediumMaze')
+        search.astar(problem, heuristic=searchAgents.manhattanHeuristic)
+        stats = problem.searchStats
+        assert stats.heuristicCalls == stats.generated + 1 and stats.heuristicTime > 0
+    finally:
+        search.SearchStats.timeHeuristics = False
+    search.SearchStats.traceMemory = True
+    try:
+        problem = _maze_problem('mediumMaze')
+        search.ucs(problem)
+        assert problem.searchStats.memoryPeak > 0
+        # A search that raises still stops the tracing it started
+        import tracemalloc
+        problem = _maze_problem('mediumMaze')
+        problem.getSuccessors = lambda state: 1 / 0
+        for fn in [search.bfs, search.idastar, search.smastar]:
+            try: fn(problem)
+            except ZeroDivisionError: pass
+            assert not tracemalloc.is_tracing()
+    finally:
+        search.SearchStats.traceMemory = False
+
+
+def test_heuristic_cache_evicts_least_recently_used():
+    search = importlib.import_module('search')
+    calls = []
+
+    @search.cachedHeuristic(maxSize=2)
+    def heuristic(state, problem=None):
+        calls.append(state)
+        return state * 10
+
+    problem = object()
+    assert [heuristic(s, problem) for s in [1, 2, 1, 3, 1, 2]] == [10, 20, 10, 30, 10, 20]
+    assert calls == [1, 2, 3, 2]
+    assert (heuristic.hits, heuristic.misses, heuristic.evictions) == (2, 4, 2)
+    other = object()
+    assert heuristic(1, other) == 10 and calls[-1] == 1
+    # Values are kept per problem, so alternating between problems (as the
+    # two directions of biastar do) still hits
+    assert heuristic(2, problem) == 20 and heuristic(1, other) == 10
+    assert (heuristic.hits, heuristic.misses) == (4, 5)
+
+
+def test_cached_heuristic_gives_same_search():
+    search = importlib.import_module('search')
+    searchAgents = importlib.import_module('searchAgents')
+    cache = search.HeuristicCache(searchAgents.manhattanHeuristic, 50)
+    results = []
+    for heuristic in [searchAgents.manhattanHeuristic, cache]:
+        problem = _maze_problem('bigMaze')
+        results.append((search.astar(problem, heuristic=heuristic), problem._expanded))
+    assert results[0] == results[1]
+    assert cache.hits > 0 and len(cache.values) == 50
+    # biastar alternates between its forward and backward problems
+    cache = search.HeuristicCache(searchAgents.manhattanHeuristic)
+    paths = [search.biastar(_maze_problem('bigMaze'), heuristic=heuristic)
+             for heuristic in [searchAgents.manhattanHeuristic, cache]]
+    assert paths[0] == paths[1] and len(set(problem for problem, state in cache.values)) == 2
+
+
+def test_node_table_rebuilds_path_from_parent_pointers():
+    search = importlib.import_module('search')
+    nodes = search.SearchNodeTable()
+    root = nodes.addRoot()
+    a = nodes.add(root, 'North', 1)
+    b = nodes.add(a, 'East', 2)
+    nodes.add(root, 'West', 1)
+    assert nodes.getPath(root) == []
+    assert nodes.getPath(b) == ['North', 'East']
+    assert nodes.getCost(b) == 2
+
+
+def test_maze_distance_oracle_matches_bfs(tmp_path):
+    import pytest
+    numpy = pytest.importorskip('numpy')
+    searchAgents = importlib.import_module('searchAgents')
+    search = importlib.import_module('search')
+    Oracle = searchAgents.MazeDistanceOracle
+    problem = _maze_problem('mediumMaze')
+    oracle = Oracle(problem.walls)
+    for goal in oracle.cells[::37]:
+        problem = _maze_problem('mediumMaze')
+        problem.goal = goal
+        assert oracle.getDistance(problem.startState, goal) == len(search.bfs(problem))
+    # Only the row of the one source queried was computed
+    assert oracle.distances is None and list(oracle.rows) == [oracle.cellIndex[problem.startState]]
+    Oracle._oracles.clear()
+    Oracle._lastOracle = None
+    cached = Oracle.forWalls(problem.walls, str(tmp_path))
+    assert cached is Oracle.forWalls(problem.walls)
+    oracle.computeAll()
+    assert (cached.distances == oracle.distances).all()
+    assert len(list(tmp_path.iterdir())) == 1
+    # Only a few oracles are kept, and big mazes get wider distances
+    for name in ['tinyMaze', 'smallMaze', 'openMaze', 'bigMaze', 'contoursMaze', 'tinySearch',
+                 'smallSearch', 'trickySearch', 'bigSearch']:
+        Oracle.forWalls(_maze_problem(name).walls)
+    assert len(Oracle._oracles) == Oracle.MAX_ORACLES
+    assert Oracle.distanceType(65534) == numpy.uint16 and Oracle.distanceType(65535) == numpy.uint32
+
+
+def test_benchmark_matrix_and_regression_check():
+    search = importlib.import_module('search')
+    sys.path.insert(0, os.path.join(SEARCH_DIR, 'benchmarks'))
+    try:
+        bench = importlib.import_module('search_bench')
+    finally:
+        sys.path.remove(os.path.join(SEARCH_DIR, 'benchmarks'))
+
+    class Options:
+        maxExpansions, timeLimit, repeats, memory = 50, 5.0, 1, True
+
+    results = bench.runMatrix(bench.ALGORITHMS, bench.PROBLEMS, ['tinyMaze', 'tinyCorners'], Options)
+    assert results['astar/PositionSearchProblem/tinyMaze']['cost'] == 8
+    assert results['jps/PositionSearchProblem/tinyMaze']['cost'] == 8
+    assert 'jps/CornersProblem/tinyCorners' not in results
+    assert results['dfs/FoodSearchProblem/tinyCorners']['status'] == 'budget'
+    assert all(result['status'] != 'error' for result in results.values())
+    assert bench.compare(results, results) == []
+
+    key = 'bfs/PositionSearchProblem/tinyMaze'
+    worse = dict(results)
+    worse[key] = dict(results[key], expanded=results[key]['expanded'] * 2, cost=results[key]['cost'] + 1)
+    worse['dfs/PositionSearchProblem/tinyMaze'] = {'status': 'budget', 'expanded': 51}
+    regressions = bench.compare(results, worse)
+    assert len(regressions) == 3
+    assert bench.compare(results, worse, threshold=1.5) == [r for r in regressions if 'expanded' not in r]
+    # Times only count when the baseline has them, as saved with --timings
+    slower = dict(results)
+    slower[key] = dict(results[key], time=results[key]['time'] + 1)
+    assert len(bench.compare(results, slower)) == 1
+    del results[key]['time']
+    assert bench.compare(results, slower) == []
+
+    # jps never calls getSuccessors, but is budgeted and bookkept all the same
+    Options.maxExpansions = 3
+    jps = [algorithm for algorithm in bench.ALGORITHMS if algorithm[0] == 'jps']
+    results = bench.runMatrix(jps, bench.PROBLEMS[:1], ['bigMaze'], Options)
+    assert results['jps/PositionSearchProblem/bigMaze'] == {'status': 'budget', 'expanded': 4}
+    problem = _maze_problem('bigMaze')
+    budgeted = bench.BudgetedProblem(problem, 10000, 5.0)
+    search.jps(budgeted)
+    assert problem._expanded == budgeted.calls == budgeted.searchStats.expanded > 0
@@ -0,0 +1,152 @@
+import importlib
+import os
+import random
+import sys
+
+SEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_DIR)
+
+
+def test_indexed_priority_queue_decrease_key():
+    util = importlib.import_module('util')
+    pq = util.IndexedPriorityQueue()
+    pq.push('a', 5)
+    pq.push('b', 3)
+    pq.push('c', 4)
+    assert pq.update('a', 1)
+    assert not pq.update('b', 7)
+    assert 'c' in pq and len(pq) == 3
+    assert [pq.pop() for _ in range(3)] == ['a', 'b', 'c']
+    assert pq.isEmpty() and 'a' not in pq
+
+
+def test_indexed_priority_queue_matches_lazy_queue_order():
+    util = importlib.import_module('util')
+    rng = random.Random(0)
+    indexed, lazy, best = util.IndexedPriorityQueue(), util.PriorityQueue(), {}
+    for _ in range(500):
+        item, priority = rng.randrange(50), rng.randrange(20)
+        indexed.update(item, priority)
+        if item not in best or priority < best[item]:
+            best[item] = priority
+            lazy.push((item, priority), priority)
+    popped = []
+    while not lazy.isEmpty():
+        item, priority = lazy.pop()
+        if best.get(item) == priority:
+            del best[item]
+            popped.append(item)
+    assert popped == [indexed.pop() for _ in range(len(popped))]
+    assert indexed.isEmpty()
+
+
+def test_queue_and_stack_extend_preserve_order():
+    util = importlib.import_module('util')
+    queue, stack = util.Queue(), util.Stack()
+    queue.push(0)
+    queue.extend([1, 2, 3])
+    stack.push(0)
+    stack.extend([1, 2, 3])
+    assert len(queue) == len(stack) == 4
+    assert [queue.pop() for _ in range(4)] == [0, 1, 2, 3]
+    assert [stack.pop() for _ in range(4)] == [3, 2, 1, 0]
+    assert queue.isEmpty() and stack.isEmpty()
+
+
+def _drain(queue):
+    items = []
+    while not queue.isEmpty():
+        items.append(queue.pop())
+    return items
+
+
+def _replay(queues, ops):
+    popped = []
+    for i, (item, priority) in enumerate(ops):
+        for queue in queues:
+            queue.update(item, priority)
+        if i % 50 == 49:
+            popped.append([queue.pop() for queue in queues])
+    return popped + list(zip(*[_drain(queue) for queue in queues]))
+
+
+def test_bucket_and_adaptive_queues_match_heap_order():
+    util = importlib.import_module('util')
+    rng = random.Random(1)
+    ops = [(rng.randrange(60), rng.randrange(30)) for _ in range(400)]
+    for popped in _replay([util.IndexedPriorityQueue(), util.BucketPriorityQueue()], ops):
+        assert len(set(popped)) == 1
+
+    # A fractional priority midway moves the adaptive queue onto the heap
+    ops[200] = (ops[200][0], 0.5)
+    adaptive = util.AdaptivePriorityQueue()
+    for popped in _replay([util.IndexedPriorityQueue(), adaptive], ops):
+        assert len(set(popped)) == 1
+    assert not adaptive.isBucketed()
+
+
+def test_bucket_queue_rejects_non_integer_priorities():
+    util = importlib.import_module('util')
+    queue = util.BucketPriorityQueue(maxPriority=10)
+    for priority in [0.5, -1, 11]:
+        try:
+            queue.push('a', priority)
+        except ValueError:
+            continue
+        assert False, priority
+    assert queue.isEmpty()
+
+
+def test_bucket_queue_creates_buckets_lazily():
+    util = importlib.import_module('util')
+    queue = util.BucketPriorityQueue()
+    for item, priority in [('far', queue.maxPriority), ('near', 3), ('near too', 3)]:
+        queue.push(item, priority)
+    assert len([bucket for bucket in queue.buckets if bucket is not None]) == 2
+    assert [queue.pop() for _ in range(3)] == ['near', 'near too', 'far']
+
+
+def test_timeouts_are_sub_second_and_work_in_threads():
+    import threading
+    import time
+    util = importlib.import_module('util')
+
+    def spin(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+        return seconds
+
+    results = {}
+
+    def run(name, seconds):
+        try:
+            results[name] = util.TimeoutFunction(spin, 0.1)(seconds)
+        except util.TimeoutFunctionException:
+            results[name] = 'timeout'
+
+    threads = [threading.Thread(target=run, args=(name, seconds)) for name, seconds in [('fast', 0.01), ('slow', 2)]]
+    start = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert results == {'fast': 0.01, 'slow': 'timeout'}
+    assert time.perf_counter() - start < 1
+
+    measured = util.TimeoutFunction(spin, 0.01, measureOnly=True)
+    try:
+        measured(0.05)
+        assert False
+    except util.TimeoutFunctionException:
+        assert measured.elapsed >= 0.05
+    time.sleep(0.15)  # no stray timeout is delivered later
+
+    # The main thread is interrupted by SIGALRM, which also reaches a call
+    # blocked in C code, and a timeout <= 0 never fires
+    start = time.perf_counter()
+    try:
+        util.TimeoutFunction(time.sleep, 0.05)(2)
+        assert False
+    except util.TimeoutFunctionException:
+        assert time.perf_counter() - start < 1
+    assert util.TimeoutFunction(spin, 0)(0.05) == 0.05
@@ -29,6 +29,7 @@
 import sys
 import inspect
 import heapq, random
+from collections import deque
 
 
 class FixedRandom:
@@ -133,12 +134,16 @@ class FixedRandom:
 class Stack:
     "A container with a last-in-first-out (LIFO) queuing policy."
     def __init__(self):
-        self.list = []
+        self.list = deque()
 
     def push(self,item):
         "Push 'item' onto the stack"
         self.list.append(item)
 
+    def extend(self, items):
+        "Push each of 'items' in order, so the last one is popped first"
+        self.list.extend(items)
+
     def pop(self):
         "Pop the most recently pushed item from the stack"
         return self.list.pop()
@@ -147,26 +152,36 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
-        self.list = []
+        self.list = deque()
 
     def push(self,item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0,item)
+        self.list.append(item)
+
+    def extend(self, items):
+        "Enqueue each of 'items' in order"
+        self.list.extend(items)
 
     def pop(self):
         """
           Dequeue the earliest enqueued item still in the queue. This
           operation removes the item from the queue.
         """
-        return self.list.pop()
+        return self.list.popleft()
 
     def isEmpty(self):
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -221,6 +236,263 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class IndexedPriorityQueue:
+    """
+      A binary-heap priority queue that keeps an index from each item to its
+      slot in the heap.  This gives O(1) membership tests and O(log n)
+      decrease-key through update, so the queue never holds more than one
+      entry per item.  Items must be hashable.
+
+      Ties are broken first-in-first-out, and an item whose priority is
+      lowered by update is ordered as if it had just been pushed, which is
+      the same order a PriorityQueue fed duplicate entries would produce.
+    """
+    def  __init__(self):
+        self.heap = []
+        self.index = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        "Adds 'item'; if it is already queued this behaves like update"
+        if item in self.index:
+            self.update(item, priority)
+            return
+        self.heap.append([priority, self.count, item])
+        self.count += 1
+        self.index[item] = len(self.heap) - 1
+        self._siftUp(len(self.heap) - 1)
+
+    def pop(self):
+        "Removes and returns the item with the lowest priority"
+        heap = self.heap
+        last = heap.pop()
+        if not heap:
+            del self.index[last[2]]
+            return last[2]
+        top = heap[0]
+        heap[0] = last
+        self.index[last[2]] = 0
+        del self.index[top[2]]
+        self._siftDown(0)
+        return top[2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        """
+          If item is queued with a higher priority, lowers it in O(log n).
+          If item is queued with an equal or lower priority, does nothing.
+          If item is not queued, pushes it.
+
+          Returns True if the queue changed.
+        """
+        position = self.index.get(item)
+        if position is None:
+            self.push(item, priority)
+            return True
+        entry = self.heap[position]
+        if entry[0] <= priority:
+            return False
+        entry[0] = priority
+        entry[1] = self.count
+        self.count += 1
+        self._siftUp(position)
+        return True
+
+    def getPriority(self, item):
+        return self.heap[self.index[item]][0]
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, position):
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        key = (entry[0], entry[1])
+        while position > 0:
+            parentPosition = (position - 1) >> 1
+            parent = heap[parentPosition]
+            if key >= (parent[0], parent[1]):
+                break
+            heap[position] = parent
+            index[parent[2]] = position
+            position = parentPosition
+        heap[position] = entry
+        index[entry[2]] = position
+
+    def _siftDown(self, position):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        key = (entry[0], entry[1])
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            right = child + 1
+            if right < size and (heap[right][0], heap[right][1]) < (heap[child][0], heap[child][1]):
+                child = right
+            if key <= (heap[child][0], heap[child][1]):
+                break
+            heap[position] = heap[child]
+            index[heap[position][2]] = position
+            position = child
+        heap[position] = entry
+        index[entry[2]] = position
+
+
+class BucketPriorityQueue:
+    """
+      A bucket (Dial's) priority queue for small non-negative integer
+      priorities.  Each priority owns a FIFO bucket, so push, update and pop
+      cost O(1) amortised instead of O(log n).  Items must be hashable.
+
+      Ordering is identical to IndexedPriorityQueue: lowest priority first,
+      ties first-in-first-out, and an item lowered by update is ordered as if
+      freshly pushed.  Pushing a priority that is not an int in
+      [0, maxPriority] raises ValueError.  A bucket is only created once a
+      priority uses it, but the bucket list grows to the highest priority
+      seen, so keep maxPriority small.
+    """
+    def  __init__(self, maxPriority=1 << 12):
+        self.maxPriority = maxPriority
+        self.buckets = []
+        self.index = {}
+        self.count = 0
+        self.size = 0
+        self.cursor = 0
+
+    def push(self, item, priority):
+        "Adds 'item'; if it is already queued this behaves like update"
+        if item in self.index:
+            self.update(item, priority)
+            return
+        self._append(item, priority)
+        self.size += 1
+
+    def pop(self):
+        "Removes and returns the item with the lowest priority"
+        if self.size == 0:
+            raise IndexError('pop from an empty priority queue')
+        buckets = self.buckets
+        while True:
+            bucket = buckets[self.cursor]
+            if not bucket: # None or empty
+                self.cursor += 1
+                continue
+            entry = bucket.popleft()
+            if entry[3]:
+                break
+        del self.index[entry[2]]
+        self.size -= 1
+        return entry[2]
+
+    def isEmpty(self):
+        return self.size == 0
+
+    def update(self, item, priority):
+        """
+          If item is queued with a higher priority, moves it to the new bucket.
+          If item is queued with an equal or lower priority, does nothing.
+          If item is not queued, pushes it.
+
+          Returns True if the queue changed.
+        """
+        entry = self.index.get(item)
+        if entry is None:
+            self.push(item, priority)
+            return True
+        if entry[0] <= priority:
+            return False
+        self._append(item, priority)
+        entry[3] = False
+        return True
+
+    def getPriority(self, item):
+        return self.index[item][0]
+
+    def entries(self):
+        "Returns the queued [priority, sequence, item] entries in pop order"
+        return [entry[:3] for bucket in self.buckets[self.cursor:] if bucket for entry in bucket if entry[3]]
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return self.size
+
+    def _append(self, item, priority):
+        if type(priority) is not int or not 0 <= priority <= self.maxPriority:
+            raise ValueError('BucketPriorityQueue needs an int priority in [0, %d], got %r' % (self.maxPriority, priority))
+        buckets = self.buckets
+        if len(buckets) <= priority:
+            buckets.extend([None] * (priority + 1 - len(buckets)))
+        bucket = buckets[priority]
+        if bucket is None:
+            bucket = buckets[priority] = deque()
+        entry = [priority, self.count, item, True]
+        self.count += 1
+        bucket.append(entry)
+        self.index[item] = entry
+        if priority < self.cursor:
+            self.cursor = priority
+
+class AdaptivePriorityQueue:
+    """
+      The frontier used by uniformCostSearch and aStarSearch.  It starts out
+      as a BucketPriorityQueue, which suits the small integer step costs and
+      heuristics of the Pacman search problems, and migrates once to an
+      IndexedPriorityQueue the first time a priority falls outside that range
+      (a float cost, a negative value, a very large value).  Both queues order
+      entries the same way, so the switch never changes which item pops next.
+    """
+    def  __init__(self, maxPriority=1 << 12):
+        self.queue = BucketPriorityQueue(maxPriority)
+        self._bind()
+
+    def push(self, item, priority):
+        try:
+            self.queue.push(item, priority)
+        except ValueError:
+            if not self.isBucketed(): raise
+            self._fallBack()
+            self.queue.push(item, priority)
+
+    def update(self, item, priority):
+        try:
+            return self.queue.update(item, priority)
+        except ValueError:
+            if not self.isBucketed(): raise
+            self._fallBack()
+            return self.queue.update(item, priority)
+
+    def isBucketed(self):
+        return isinstance(self.queue, BucketPriorityQueue)
+
+    def __contains__(self, item):
+        return item in self.queue
+
+    def __len__(self):
+        return len(self.queue)
+
+    def _bind(self):
+        # pop and isEmpty can never trigger a fallback, so skip the wrapper
+        self.pop = self.queue.pop
+        self.isEmpty = self.queue.isEmpty
+        self.getPriority = self.queue.getPriority
+
+    def _fallBack(self):
+        heap = IndexedPriorityQueue()
+        # Entries in pop order already satisfy the heap invariant
+        heap.heap = self.queue.entries()
+        heap.index = dict((entry[2], position) for position, entry in enumerate(heap.heap))
+        heap.count = self.queue.count
+        self.queue = heap
+        self._bind()
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
@@ -472,10 +744,10 @@ def normalize(vectorOrCounter):
         if s == 0: return vector
         return [el / s for el in vector]
 
-def nSample(distribution, values, n):
+def nSample(distribution, values, n, rng=random):
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
+    rand = [rng.random() for i in range(n)]
     rand.sort()
     samples = []
     samplePos, distPos, cdf = 0,0, distribution[0]
@@ -488,23 +760,23 @@ def nSample(distribution, values, n):
             cdf += distribution[distPos]
     return samples
 
-def sample(distribution, values = None):
+def sample(distribution, values = None, rng=random):
     if type(distribution) == Counter:
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    choice = random.random()
+    choice = rng.random()
     i, total= 0, distribution[0]
     while choice > total:
         i += 1
         total += distribution[i]
     return values[i]
 
-def sampleFromCounter(ctr):
+def sampleFromCounter(ctr, rng=random):
     items = sorted(ctr.items())
-    return sample([v for k,v in items], [k for k,v in items])
+    return sample([v for k,v in items], [k for k,v in items], rng)
 
 def getProbability(value, distribution, values):
     """
@@ -517,15 +789,15 @@ def getProbability(value, distribution, values):
             total += prob
     return total
 
-def flipCoin( p ):
-    r = random.random()
+def flipCoin( p, rng=random ):
+    r = rng.random()
     return r < p
 
-def chooseFromDistribution( distribution ):
+def chooseFromDistribution( distribution, rng=random ):
     "Takes either a counter or a list of (prob, key) pairs and samples"
     if type(distribution) == dict or type(distribution) == Counter:
-        return sample(distribution)
-    r = random.random()
+        return sample(distribution, rng=rng)
+    r = rng.random()
     base = 0.0
     for prob, element in distribution:
         base += prob
@@ -600,45 +872,135 @@ def pause():
 
 # code to handle timeouts
 #
-# FIXME
-# NOTE: TimeoutFuncton is NOT reentrant.  Later timeouts will silently
-# disable earlier timeouts.  Could be solved by maintaining a global list
-# of active time outs.  Currently, questions which have test cases calling
-# this have all student code so wrapped.
+# Timeouts are enforced by one watchdog thread per process, which raises
+# TimeoutFunctionException in whichever thread overran its deadline.  Unlike
+# SIGALRM this works off the main thread, has sub-second resolution and
+# nests: every TimeoutFunction call keeps its own deadline.
 #
+import os
 import signal
+import threading
 import time
+import ctypes
+
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
+def _raiseInThread( threadId, exceptionType ):
+    """
+    Schedules exceptionType to be raised in the thread threadId the next time
+    it runs Python code; None cancels a scheduled exception.
+    """
+    ctypes.pythonapi.PyThreadState_SetAsyncExc( ctypes.c_ulong(threadId), ctypes.py_object(exceptionType) if exceptionType != None else None )
+
+def _raiseTimeout( signum, frame ):
+    raise TimeoutFunctionException()
+
+class Watchdog:
+    """
+    A daemon thread that interrupts calls running past their deadline, for
+    threads that cannot receive SIGALRM.  The exception is delivered between
+    Python bytecodes, so a call blocked inside a long C function (such as
+    time.sleep) is interrupted once it returns.
+    """
+    def __init__( self ):
+        self.condition = threading.Condition()
+        self.deadlines = []   # heap of (deadline, token)
+        self.armed = {}       # token -> id of the thread to interrupt
+        self.nextToken = 0
+        self.pid = os.getpid()
+        self.thread = threading.Thread( target=self._watch, name='TimeoutWatchdog' )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def arm( self, seconds ):
+        "Starts a deadline for the calling thread and returns its token."
+        with self.condition:
+            token = self.nextToken
+            self.nextToken += 1
+            self.armed[token] = threading.get_ident()
+            heapq.heappush( self.deadlines, (time.perf_counter() + seconds, token) )
+            if self.deadlines[0][1] == token: self.condition.notify()
+        return token
+
+    def disarm( self, token ):
+        """
+        Ends the deadline token.  Raises TimeoutFunctionException if it had
+        already fired, cancelling the exception if it has not been delivered.
+        """
+        with self.condition:
+            fired = self.armed.pop( token, None ) == None
+        if fired:
+            _raiseInThread( threading.get_ident(), None )
+            raise TimeoutFunctionException()
+
+    def _watch( self ):
+        with self.condition:
+            while True:
+                while len(self.deadlines) > 0 and self.deadlines[0][1] not in self.armed:
+                    heapq.heappop( self.deadlines )
+                if len(self.deadlines) == 0:
+                    self.condition.wait()
+                    continue
+                deadline, token = self.deadlines[0]
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    self.condition.wait( remaining )
+                    continue
+                heapq.heappop( self.deadlines )
+                _raiseInThread( self.armed.pop( token ), TimeoutFunctionException )
+
+    _instance = None
+
+    def get():
+        "The process's watchdog, started on first use (and again after a fork)."
+        watchdog = Watchdog._instance
+        if watchdog == None or watchdog.pid != os.getpid():
+            watchdog = Watchdog._instance = Watchdog()
+        return watchdog
+    get = staticmethod(get)
 
 class TimeoutFunction:
-    def __init__(self, function, timeout):
+    """
+    Calls function, raising TimeoutFunctionException if it runs for more than
+    timeout seconds (which may be fractional); a timeout <= 0 means no limit.
+    On the main thread the call is interrupted by SIGALRM, elsewhere by the
+    Watchdog.  With measureOnly the call is never interrupted; it is only
+    timed, and the exception raised after it returns late, which costs no
+    more than reading the clock twice.  Either way the duration of the last
+    call is left in elapsed.
+    """
+    def __init__(self, function, timeout, measureOnly=False):
         self.timeout = timeout
         self.function = function
-
-    def handle_timeout(self, signum, frame):
-        raise TimeoutFunctionException()
+        self.measureOnly = measureOnly
+        self.elapsed = 0.0
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
-            old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+        startTime = time.perf_counter()
+        if self.measureOnly or self.timeout <= 0:
+            result = self.function(*args, **keyArgs)
+            self.elapsed = time.perf_counter() - startTime
+            if self.timeout > 0 and self.elapsed >= self.timeout: raise TimeoutFunctionException()
+            return result
+        if hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread():
+            old = signal.signal(signal.SIGALRM, _raiseTimeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
             try:
                 result = self.function(*args, **keyArgs)
             finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
-        else:
-            startTime = time.time()
+                self.elapsed = time.perf_counter() - startTime
+            return result
+        watchdog = Watchdog.get()
+        token = watchdog.arm(self.timeout)
+        try:
             result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
-            if timeElapsed >= self.timeout:
-                self.handle_timeout(None, None)
+        finally:
+            self.elapsed = time.perf_counter() - startTime
+            watchdog.disarm(token)
         return result
 
 